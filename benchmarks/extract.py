@@ -0,0 +1,49 @@
+"""
+Micro-benchmark of the __DATA__ extraction on saved cc.com pages.
+
+Compares the old lazy regex with page.extractData.
+Save some pages first, eg.:
+    curl -o standup.html https://www.cc.com/topic/stand-up
+
+usage: python benchmarks/extract.py [-n RUNS] page.html [page.html ...]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from resources.lib.page import extractData  # noqa: E402
+
+DATA_RE = '__DATA__\\s*=\\s*(.+?);\\s*window\\.__PUSH_STATE__'
+
+
+def regexData(html):
+    return json.loads(re.search(DATA_RE, html).group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--runs', type=int, default=50)
+    parser.add_argument('pages', nargs='+')
+    args = parser.parse_args()
+
+    print(f"{'page':<30} {'size':>9} {'regex ms':>10} {'extract ms':>11} {'speedup':>8}")
+    for path in args.pages:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        if regexData(html) != extractData(html):
+            print(f"{os.path.basename(path)}: results differ!")
+            continue
+        old = min(timeit.repeat(lambda: regexData(html), number=args.runs, repeat=3))
+        new = min(timeit.repeat(lambda: extractData(html), number=args.runs, repeat=3))
+        print(f"{os.path.basename(path)[:30]:<30} {len(html):>9} "
+              f"{old * 1000 / args.runs:>10.3f} {new * 1000 / args.runs:>11.3f} "
+              f"{old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
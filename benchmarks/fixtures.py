@@ -0,0 +1,221 @@
+"""
+Fixtures replayed by the benchmarks in place of cc.com and yt-dlp.
+
+A fixtures folder contains an index.json:
+{
+    "pages": {url: file},           # html or json bodies
+    "media": {mgid or url: file},   # extract_info results
+    "scenarios": [{"name": str, "params": plugin params}, ...]
+}
+Recorded fixtures are created by record.py, synthetic ones by
+createSynthetic, so the benchmarks can run without recording.
+"""
+import json
+import os
+import sys
+import types
+
+BASE_URL = 'https://www.cc.com'
+
+
+class FixtureResponse(object):
+    encoding = None
+
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(f"HTTP {self.status_code}")
+
+
+class Fixtures(object):
+    """
+    Serves the bodies of a fixtures folder, counting the requests.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, 'index.json'), encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.requests = 0
+        self._bodies = {}
+
+    def _read(self, file):
+        if file not in self._bodies:
+            with open(os.path.join(self.folder, file), encoding='utf-8') as f:
+                self._bodies[file] = f.read()
+        return self._bodies[file]
+
+    @property
+    def scenarios(self):
+        return self.index['scenarios']
+
+    def get(self, url, **kwargs):
+        """ requests.Session.get stand-in """
+        self.requests += 1
+        file = self.index['pages'].get(url.replace('%3A', ':'))
+        if file is None:
+            return FixtureResponse(404)
+        return FixtureResponse(200, self._read(file))
+
+    def extractInfo(self, id, items=None):
+        """ YoutubeDL.extract_info stand-in, items as playlist_items """
+        file = self.index['media'].get(id)
+        if file is None:
+            raise IOError(f"no media fixture for {id}")
+        ytInfo = json.loads(self._read(file))
+        if items and ytInfo.get('entries'):
+            selected = set()
+            for part in items.split(','):
+                start, _, end = part.partition('-')
+                selected.update(range(int(start), int(end or start) + 1))
+            ytInfo['playlist_count'] = len(ytInfo['entries'])
+            ytInfo['entries'] = [
+                dict(x, playlist_count=ytInfo['playlist_count'])
+                for x in ytInfo['entries'] if x.get('playlist_index') in selected]
+        return ytInfo
+
+    def install(self):
+        """
+        Route the plugin network and yt-dlp calls to the fixtures,
+        the plugin modules must be importable.
+        """
+        from resources.lib import comedycentral
+
+        comedycentral.getSession = lambda: self
+        fixtures = self
+
+        class YoutubeDL(object):
+
+            def __init__(self, params=None, auto_init=True):
+                self.params = params or {}
+
+            def get_info_extractor(self, ie_key):
+                return types.SimpleNamespace(suitable=lambda url: (
+                    url.startswith(('https://www.cc.com/', 'mgid:arc:video:comedycentral.com:'))))
+
+            def add_default_info_extractors(self):
+                pass
+
+            def extract_info(self, url, download=True, ie_key=None, **kwargs):
+                return fixtures.extractInfo(url, self.params.get('playlist_items'))
+
+        yt_dlp = types.ModuleType('resources.lib.yt_dlp')
+        yt_dlp.YoutubeDL = YoutubeDL
+        yt_dlp.version = types.SimpleNamespace(__version__='fixtures')
+        sys.modules['resources.lib.yt_dlp'] = yt_dlp
+
+
+def _card(cardType, url, title, n):
+    return {
+        'cardType': cardType,
+        'url': url,
+        'title': title,
+        'id': f"00000000-0000-0000-0000-{n:012d}",
+        'meta': {
+            'header': {'title': title},
+            'subHeader': f"{title} subtitle",
+            'label': 'Show',
+            'description': 'A plot long enough to look like a real one. ' * 3,
+            'date': '01/02/2022',
+            'itemAriaLabel': f"{title} Season 1 Episode {n}",
+        },
+        'media': {
+            'image': {'url': f"https://images.cc.com/{n}?quality=0.7"},
+            'duration': '21:30',
+        },
+    }
+
+
+def _html(children, filler=300):
+    # cc.com pages are some hundred KB of markup around the state
+    return (
+        '<html><head>' + '<script src="/x.js"></script>' * filler + '</head><body>'
+        + '<div class="x">text; window.x = 1</div>' * filler
+        + '<script>window.__DATA__ = ' + json.dumps({'children': [
+            {'type': 'Header', 'props': {'links': ['x'] * 200}},
+            {'type': 'MainContainer', 'children': children},
+            {'type': 'Footer', 'props': {'links': ['y'] * 200}}]})
+        + ';\n window.__PUSH_STATE__ = {};</script>'
+        + '<p>tail</p>' * filler * 10 + '</body></html>')
+
+
+def createSynthetic(folder):
+    """
+    Write a synthetic fixtures folder with the structure of cc.com pages.
+
+    :param      folder:  destination folder
+    :type       folder:  str
+    """
+    os.makedirs(folder, exist_ok=True)
+    pages = {}
+    media = {}
+
+    def save(name, url, body, index=pages):
+        with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+            f.write(body)
+        index[url] = name
+
+    save('shows.json', f"{BASE_URL}/api/shows/1/40", json.dumps({
+        'items': [_card('series', f"/shows/show-{n}", f"Show {n}", n) for n in range(40)],
+        'loadMore': {'url': '/api/shows/2/40', 'loadingTitle': 'Loading'}}))
+    save('show.html', f"{BASE_URL}/shows/show-0", _html([
+        {'type': 'SeasonSelector', 'props': {'items': [
+            {'label': f"Season {n}", 'url': f"/shows/show-0/season-{n}"} for n in range(1, 9)]}}]))
+    for n in range(1, 9):
+        save(f"season-{n}.html", f"{BASE_URL}/shows/show-0/season-{n}", _html([
+            {'type': 'LineList', 'props': {'type': 'video-guide', 'filters': [{'items': [
+                {'label': 'All', 'url': f"/api/episodes/season-{n}/1/40"}]}]}}]))
+    episodes = json.dumps({
+        'items': [_card('episode', f"/episodes/ep{n}/title", f"Episode {n}", n) for n in range(40)]
+        + [{'cardType': 'ad'}],
+        'loadMore': {'url': '/api/episodes/mgid:x/2/40', 'loadingTitle': 'Loading'}})
+    save('episodes.json', f"{BASE_URL}/api/episodes/1/40", episodes)
+    # pages 2-5 of the episodes, the first card repeats the last of the previous page
+    for n in range(2, 6):
+        save(f"episodes-{n}.json", f"{BASE_URL}/api/episodes/mgid:x/{n}/40", json.dumps({
+            'items': [_card('episode', f"/episodes/ep{x}/title", f"Episode {x}", x)
+                      for x in range(n * 40 - 41, n * 40)],
+            'loadMore': {'url': f"/api/episodes/mgid:x/{n + 1}/40", 'loadingTitle': 'Loading'}
+            if n < 5 else None}))
+    for n in range(1, 9):
+        pages[f"{BASE_URL}/api/episodes/season-{n}/1/40"] = 'episodes.json'
+    save('topic.html', f"{BASE_URL}/topic/stand-up", _html([
+        {'type': 'Fragment', 'children': [{'type': 'LineList', 'props': {
+            'items': [_card(x, f"/{'shows' if x == 'series' else 'video-clips'}/t{n}/title", f"Item {n}", n)
+                      for n, x in enumerate(['series', 'episode', 'promo', 'ad'] * 12)],
+            'loadMore': {'url': '/api/more/tpl/1', 'loadingTitle': 'Loading'}}}]}]))
+
+    acts = [{
+        'playlist_index': n, 'n_entries': 4, 'duration': 420,
+        'url': f"https://media.cc.com/act{n}/master.m3u8",
+        'thumbnail': f"https://images.cc.com/act{n}.jpg",
+        'subtitles': {'en': [
+            {'url': f"https://media.cc.com/act{n}.vtt", 'ext': 'vtt'},
+            {'url': f"https://media.cc.com/act{n}.ttml", 'ext': 'ttml'}]},
+        'formats': [{
+            'format_id': f"hls-{h}", 'height': h, 'tbr': h * 5, 'vcodec': 'avc1',
+            'url': f"https://media.cc.com/act{n}/{h}.m3u8",
+            'http_headers': {'User-Agent': 'x' * 100}, 'fragments': ['f'] * 50,
+        } for h in [240, 360, 432, 540, 720, 1080]],
+    } for n in range(1, 5)]
+    save('media.json', 'mgid:arc:video:comedycentral.com:00000000-0000-0000-0000-000000000000',
+         json.dumps({'_type': 'playlist', 'entries': acts}), media)
+
+    scenarios = [
+        {'name': 'showsList', 'params': {'mode': 'SHOWS', 'url': f"{BASE_URL}/api/shows/1/40"}},
+        {'name': 'loadShows', 'params': {'mode': 'GENERIC', 'url': f"{BASE_URL}/shows/show-0", 'name': 'Show 0'}},
+        {'name': 'loadTopic', 'params': {'mode': 'GENERIC', 'url': f"{BASE_URL}/topic/stand-up", 'name': 'Standup'}},
+        {'name': 'loadItems', 'params': {'mode': 'EPISODES', 'url': f"{BASE_URL}/api/episodes/1/40"}},
+        {'name': 'loadAllItems', 'params': {
+            'mode': 'EPISODES_ALL', 'url': f"{BASE_URL}/api/episodes/1/40", 'name': 'Show 0'}},
+        {'name': 'getMediaUrl', 'params': {
+            'mode': 'PLAY', 'url': f"{BASE_URL}/episodes/ep0/title", 'name': 'Episode 0',
+            'mgid': '00000000-0000-0000-0000-000000000000'}},
+    ]
+    with open(os.path.join(folder, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'pages': pages, 'media': media, 'scenarios': scenarios}, f, indent=2)
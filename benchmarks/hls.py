@@ -0,0 +1,175 @@
+"""
+Act transitions with and without the HLS proxy.
+
+Serves static HLS fixtures (a few acts, two renditions each) from a
+local server adding a fixed latency to every request, as a CDN would,
+then plays them as Kodi does: one act after the other, each one
+opening its own media playlist, and through the proxy as a single
+stitched playlist. Reports the gap at the act boundaries, the time
+to get the first segment of an act once the previous one is done,
+and checks the stitched stream has the same segments and bytes.
+
+usage: python benchmarks/hls.py [--acts N] [--segments N] [--latency S] [--pace S]
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import urljoin
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [ROOT]
+
+import requests  # noqa: E402
+
+from resources.lib import playback  # noqa: E402
+from resources.lib.hlsproxy import HLSProxy  # noqa: E402
+from resources.lib.hlsproxy import mediaURL  # noqa: E402
+
+RENDITIONS = [(360, 800), (720, 2500)]
+SEGMENT_BYTES = 128 * 1024
+
+
+def createFixtures(folder, acts, segments):
+    """
+    Write the media playlists and segments of every act and rendition.
+    """
+    for act in range(acts):
+        for height, kbps in RENDITIONS:
+            path = os.path.join(folder, f"act{act}", str(height))
+            os.makedirs(path, exist_ok=True)
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:6',
+                     '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+            for n in range(segments):
+                with open(os.path.join(path, f"seg{n}.ts"), 'wb') as f:
+                    f.write(bytes([act, n]) * (SEGMENT_BYTES // 2))
+                lines += ['#EXTINF:6.000,', f"seg{n}.ts"]
+            with open(os.path.join(path, 'index.m3u8'), 'w') as f:
+                f.write('\n'.join(lines + ['#EXT-X-ENDLIST', '']))
+
+
+def serve(folder, latency):
+    class Handler(SimpleHTTPRequestHandler):
+
+        def do_GET(self):
+            time.sleep(latency)
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', 0), functools.partial(Handler, directory=folder))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def createRecord(base, acts):
+    return {
+        'v': playback.RECORD_VERSION,
+        'type': 'playlist',
+        'acts': [{
+            'idx': act,
+            'count': acts,
+            'manifest': f"{base}/act{act}/{RENDITIONS[-1][0]}/index.m3u8",
+            'ladder': [[h, kbps, f"{base}/act{act}/{h}/index.m3u8"] for h, kbps in RENDITIONS],
+            'subs': [],
+            'duration': 60,
+            'thumbnail': None,
+        } for act in range(acts)],
+    }
+
+
+def segmentURLs(session, playlist):
+    text = session.get(playlist).text
+    return [urljoin(playlist, x) for x in text.splitlines() if x and not x.startswith('#')]
+
+
+def play(session, playlists, pace):
+    """
+    Download the segments of every playlist in order, a playlist is
+    opened only when the previous one is done, as Kodi does with the
+    items of a playlist.
+
+    :returns:   gaps at the boundaries in seconds and downloaded bytes
+    :rtype:     tuple
+    """
+    gaps = []
+    data = []
+    last = None
+    for playlist in playlists:
+        for n, url in enumerate(segmentURLs(session, playlist)):
+            data.append(session.get(url).content)
+            if n == 0 and last is not None:
+                gaps.append(time.perf_counter() - last)
+            time.sleep(pace)
+            last = time.perf_counter()
+    return gaps, data
+
+
+def playStitched(session, playlist, segments, pace):
+    """
+    Download the segments of the stitched playlist in order.
+
+    :returns:   gaps at the boundaries in seconds and downloaded bytes
+    :rtype:     tuple
+    """
+    gaps = []
+    data = []
+    last = None
+    for n, url in enumerate(segmentURLs(session, playlist)):
+        data.append(session.get(url).content)
+        if n and n % segments == 0:
+            gaps.append(time.perf_counter() - last)
+        time.sleep(pace)
+        last = time.perf_counter()
+    return gaps, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--acts', type=int, default=4)
+    parser.add_argument('--segments', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--pace', type=float, default=0.2)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='plugin.video.cc.com-hls-')
+    createFixtures(folder, args.acts, args.segments)
+    server = serve(folder, args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    record = createRecord(base, args.acts)
+
+    session = requests.Session()
+    proxy = HLSProxy(requests.Session(), lambda id: record if id == 'fixture' else None)
+    proxy.start()
+
+    height = RENDITIONS[-1][0]
+    direct, directData = play(
+        session, [playback.selectRung(x, height) for x in record['acts']], args.pace)
+
+    stitched = session.get(mediaURL(proxy.port, 'fixture', height)).text
+    discontinuities = stitched.count('#EXT-X-DISCONTINUITY')
+    proxied, proxiedData = playStitched(
+        session, mediaURL(proxy.port, 'fixture', height), args.segments, args.pace)
+
+    print(f"{'':<10} {'gap ms median':>14} {'gap ms max':>11} {'segments':>9}")
+    for name, gaps, data in [('direct', direct, directData), ('proxy', proxied, proxiedData)]:
+        print(f"{name:<10} {statistics.median(gaps) * 1000:>14.1f} "
+              f"{max(gaps) * 1000:>11.1f} {len(data):>9}")
+    ok = directData == proxiedData and discontinuities == args.acts - 1
+    print(f"discontinuities = {discontinuities}, same segments = {directData == proxiedData}")
+    proxy.stop()
+    server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
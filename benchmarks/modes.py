@@ -0,0 +1,156 @@
+"""
+Offline benchmark of the plugin modes.
+
+Every scenario of the fixtures (showsList, loadShows, loadTopic,
+loadItems, loadAllItems, getMediaUrl) is run through ComedyCentral.main
+with the stub xbmc* modules, and cc.com/yt-dlp
+replayed from fixtures.
+Reports per scenario latency, items/sec, network requests and peak
+allocated memory, with a cold and a warm cache.
+
+usage:
+    python benchmarks/modes.py [--fixtures DIR] [-n RUNS]
+                               [--save FILE] [--baseline FILE [--threshold 0.2]]
+
+Without --fixtures synthetic fixtures are used, record real ones
+with record.py. With --baseline the exit code is 1 if a scenario
+is slower than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+sys.path[:0] = [STUBS, ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import xbmc  # noqa: E402
+import xbmcplugin  # noqa: E402
+
+from fixtures import Fixtures  # noqa: E402
+from fixtures import createSynthetic  # noqa: E402
+
+CACHES = ['cold', 'warm']
+
+
+def clearCache():
+    """
+    Delete the cache database of the stub profile.
+    """
+    from resources.lib import addonutils
+    from resources.lib.cache import CACHE_FILE
+
+    path = os.path.join(addonutils.DATA_PATH_T, CACHE_FILE)
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def runOnce(scenario, cold):
+    """
+    Run a scenario as a plugin invocation.
+
+    :returns:   seconds and number of items produced
+    :rtype:     tuple
+    """
+    from urllib.parse import urlencode
+    from resources.lib.main import ComedyCentral
+
+    if cold:
+        clearCache()
+    del xbmcplugin.ITEMS[:]
+    del xbmc.PLAYLIST_ITEMS[:]
+    sys.argv[1:] = ['1', f"?{urlencode(scenario['params'])}"]
+    start = time.perf_counter()
+    try:
+        ComedyCentral().main()
+    except SystemExit:
+        pass
+    return time.perf_counter() - start, len(xbmcplugin.ITEMS) + len(xbmc.PLAYLIST_ITEMS)
+
+
+def measure(fixtures, scenario, cache, runs):
+    cold = cache == 'cold'
+    # fill the cache, and the import caches, before measuring
+    runOnce(scenario, cold)
+    fixtures.requests = 0
+    times = []
+    for _ in range(runs):
+        elapsed, items = runOnce(scenario, cold)
+        times.append(elapsed)
+    requests = fixtures.requests / runs
+
+    tracemalloc.start()
+    runOnce(scenario, cold)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'ms': median * 1000,
+        'items': items,
+        'items_s': items / median if median else 0,
+        'requests': requests,
+        'peak_kb': peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures')
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    parser.add_argument('--save')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('scenarios', nargs='*')
+    args = parser.parse_args()
+    # plugin invocation arguments, params are set by runOnce
+    sys.argv = ['plugin://plugin.video.cc.com/', '1', '']
+
+    folder = args.fixtures
+    if not folder:
+        folder = os.path.join(tempfile.gettempdir(), 'plugin.video.cc.com-fixtures')
+        createSynthetic(folder)
+    fixtures = Fixtures(folder)
+    fixtures.install()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'scenario':<14} {'cache':<5} {'ms':>9} {'items':>6} {'items/s':>9} "
+          f"{'requests':>9} {'peak KB':>9} {'vs base':>8}")
+    for scenario in fixtures.scenarios:
+        if args.scenarios and scenario['name'] not in args.scenarios:
+            continue
+        for cache in CACHES:
+            key = f"{scenario['name']}/{cache}"
+            result = results[key] = measure(fixtures, scenario, cache, args.runs)
+            delta = ''
+            if key in baseline:
+                ratio = result['ms'] / baseline[key]['ms'] - 1
+                delta = f"{ratio:+.0%}"
+                if ratio > args.threshold:
+                    regressions.append(key)
+            print(f"{scenario['name']:<14} {cache:<5} {result['ms']:>9.2f} {result['items']:>6} "
+                  f"{result['items_s']:>9.0f} {result['requests']:>9.1f} "
+                  f"{result['peak_kb']:>9.0f} {delta:>8}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Record fixtures of cc.com for the modes benchmark.
+
+Runs every scenario against the live site with the stub xbmc* modules,
+saving every page downloaded and, for the PLAY scenario, the yt-dlp
+extract_info result. The fixtures folder can then be replayed with
+python benchmarks/modes.py --fixtures DIR
+
+usage: python benchmarks/record.py DIR [--show URL] [--topic URL] [--no-media]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+sys.path[:0] = [STUBS, ROOT]
+
+BASE_URL = 'https://www.cc.com'
+
+
+class Recorder(object):
+    """
+    Wraps the plugin session saving the bodies of the responses.
+    """
+
+    def __init__(self, folder, session):
+        self.folder = folder
+        self.session = session
+        self.pages = {}
+        self.media = {}
+
+    def _save(self, index, key, body, ext):
+        name = f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.{ext}"
+        with open(os.path.join(self.folder, name), 'w', encoding='utf-8') as f:
+            f.write(body)
+        index[key] = name
+
+    def get(self, url, **kwargs):
+        # no validators, fixtures are always full bodies
+        kwargs.pop('headers', None)
+        response = self.session.get(url, **kwargs)
+        if response.status_code == 200:
+            ext = 'json' if response.text.lstrip().startswith('{') else 'html'
+            self._save(self.pages, url.replace('%3A', ':'), response.text, ext)
+        return response
+
+    def saveMedia(self, key, ytInfo):
+        self._save(self.media, key, json.dumps(ytInfo), 'json')
+
+
+def run(params):
+    from urllib.parse import urlencode
+    from resources.lib.main import ComedyCentral
+
+    sys.argv[1:] = ['1', f"?{urlencode(params)}"]
+    try:
+        ComedyCentral().main()
+    except SystemExit:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder')
+    parser.add_argument('--show', default=f"{BASE_URL}/shows/the-daily-show-with-trevor-noah")
+    parser.add_argument('--topic', default=f"{BASE_URL}/topic/stand-up")
+    parser.add_argument('--no-media', action='store_true')
+    args = parser.parse_args()
+    sys.argv = ['plugin://plugin.video.cc.com/', '1', '']
+    os.makedirs(args.folder, exist_ok=True)
+
+    import xbmcplugin
+    from resources.lib import comedycentral
+
+    recorder = Recorder(args.folder, comedycentral.getSession())
+    comedycentral.getSession = lambda: recorder
+
+    scenarios = [
+        {'name': 'showsList', 'params': {'mode': 'SHOWS', 'url': f"{BASE_URL}/api/shows/1/40"}},
+        {'name': 'loadShows', 'params': {'mode': 'GENERIC', 'url': args.show, 'name': 'Show'}},
+        {'name': 'loadTopic', 'params': {'mode': 'GENERIC', 'url': args.topic, 'name': 'Topic'}},
+    ]
+    lists = []
+    for scenario in scenarios:
+        print(f"recording {scenario['name']}")
+        del xbmcplugin.ITEMS[:]
+        run(scenario['params'])
+        if scenario['name'] == 'loadShows':
+            # the first list of episodes of the show
+            lists = [x for x in xbmcplugin.ITEMS if 'mode=EPISODES' in x[0]]
+    if lists:
+        from urllib.parse import parse_qsl, urlsplit
+        params = dict(parse_qsl(urlsplit(lists[0][0]).query))
+        scenarios.append({'name': 'loadItems', 'params': params})
+        print('recording loadItems')
+        del xbmcplugin.ITEMS[:]
+        run(params)
+        videos = [dict(parse_qsl(urlsplit(x[0]).query)) for x in xbmcplugin.ITEMS if 'mode=PLAY' in x[0]]
+        if videos and not args.no_media:
+            from resources.lib.resolver import Resolver
+
+            video = videos[0]
+            key = comedycentral.CC()._getMgid(video.get('mgid')) or video['url']
+            print(f"recording getMediaUrl {key}")
+            recorder.saveMedia(key, Resolver().extractInfo(key))
+            scenarios.append({'name': 'getMediaUrl', 'params': video})
+
+    with open(os.path.join(args.folder, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'pages': recorder.pages, 'media': recorder.media, 'scenarios': scenarios}, f, indent=2)
+    print(f"{len(recorder.pages)} pages, {len(recorder.media)} media, {len(scenarios)} scenarios")
+
+
+if __name__ == '__main__':
+    main()
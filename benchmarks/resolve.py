@@ -0,0 +1,116 @@
+"""
+Resolve time of yt-dlp with the default options and with the resolver.
+
+Every run is a fresh interpreter, as Kodi does for every play, and
+reports the time spent importing yt-dlp, creating the YoutubeDL
+instance and finding the extractor of the ids of the fixtures, and
+the number of extractors registered. With --live the ids are also
+resolved against cc.com, checking both give the same playback record.
+
+usage: python benchmarks/resolve.py [-n RUNS] [--fixtures DIR] [--live]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WAYS = ['default', 'resolver']
+
+
+def child(way, ids, live):
+    sys.path[:0] = [ROOT]
+    start = time.perf_counter()
+    from resources.lib import yt_dlp
+    from resources.lib import playback
+    imported = time.perf_counter()
+
+    if way == 'default':
+        ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
+        created = time.perf_counter()
+        # what extract_info does without ie_key
+        keys = [next((k for k, ie in ydl._ies.items() if ie.suitable(x)), None) for x in ids]
+        matched = time.perf_counter()
+        extract = lambda x: ydl.extract_info(x, download=False)
+    else:
+        from resources.lib.resolver import Resolver
+
+        resolver = Resolver()
+        ydl = resolver.ydl
+        created = time.perf_counter()
+        keys = [resolver.ieKey(x) for x in ids]
+        matched = time.perf_counter()
+        extract = resolver.extractInfo
+
+    records = []
+    if live:
+        records = [playback.createRecord(extract(x)) for x in ids]
+    print(json.dumps({
+        'import': imported - start,
+        'init': created - imported,
+        'match': matched - created,
+        'extract': time.perf_counter() - matched,
+        'extractors': len(ydl._ies),
+        'keys': keys,
+        'records': records,
+    }))
+
+
+def run(way, ids, live):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', way, '--ids', json.dumps(ids)]
+        + (['--live'] if live else []),
+        capture_output=True, text=True)
+    if output.returncode:
+        sys.exit(output.stderr.strip().splitlines()[-1])
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - start
+    return result
+
+
+def fixtureIds(folder):
+    if folder is None:
+        from fixtures import createSynthetic
+
+        folder = tempfile.mkdtemp(prefix='plugin.video.cc.com-')
+        createSynthetic(folder)
+    with open(os.path.join(folder, 'index.json'), encoding='utf-8') as f:
+        return list(json.load(f)['media'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('--fixtures')
+    parser.add_argument('--live', action='store_true')
+    parser.add_argument('--child')
+    parser.add_argument('--ids')
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, json.loads(args.ids), args.live)
+
+    ids = fixtureIds(args.fixtures)
+    print(f"{'':<10} {'process ms':>10} {'import ms':>10} {'init ms':>8} {'match ms':>9} "
+          f"{'extract ms':>11} {'extractors':>11}  keys")
+    results = {}
+    for way in WAYS:
+        results[way] = [run(way, ids, args.live) for _ in range(1 if args.live else args.runs)]
+        median = {k: statistics.median(x[k] for x in results[way]) * 1000
+                  for k in ['process', 'import', 'init', 'match', 'extract']}
+        first = results[way][0]
+        print(f"{way:<10} {median['process']:>10.1f} {median['import']:>10.1f} "
+              f"{median['init']:>8.1f} {median['match']:>9.1f} {median['extract']:>11.1f} "
+              f"{first['extractors']:>11}  {', '.join(str(x) for x in first['keys'])}")
+    if args.live:
+        same = results['default'][0]['records'] == results['resolver'][0]['records']
+        print(f"same records = {same}")
+        sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Startup benchmark of the plugin, run with the stub xbmc* modules.
+
+Every mode is run in a fresh interpreter, as Kodi does for every
+directory open, and reports the time spent importing the plugin,
+the time to the first directory item and which heavy modules
+have been imported. The network is replaced by small canned responses.
+
+usage: python benchmarks/startup.py [-n RUNS] [MODE ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+HEAVY = ['requests', 'urllib3', 'sqlite3', 'zlib', 'concurrent.futures']
+
+MODES = {
+    'MENU': {},
+    'SHOWS': {'mode': 'SHOWS', 'url': 'https://www.cc.com/api/shows/1/40'},
+    'EPISODES': {'mode': 'EPISODES', 'url': 'https://www.cc.com/api/episodes/1/40'},
+    'GENERIC': {'mode': 'GENERIC', 'url': 'https://www.cc.com/topic/stand-up', 'name': 'Standup'},
+}
+
+CARD = {
+    'cardType': 'episode', 'url': '/episodes/abc/show-title', 'title': 'Title',
+    'id': '00000000-0000-0000-0000-000000000000',
+    'meta': {
+        'header': {'title': 'Show'}, 'subHeader': 'Episode title', 'label': 'Show',
+        'description': 'Plot', 'date': '01/02/2022',
+        'itemAriaLabel': 'Show Season 1 Episode 2'},
+    'media': {'image': {'url': 'https://images.cc.com/abc?x=1'}, 'duration': '21:30'},
+}
+RESPONSES = {
+    'api': json.dumps({'items': [CARD] * 40, 'loadMore': None}),
+    'topic': '<script>window.__DATA__ = %s;window.__PUSH_STATE__ = {};</script>' % json.dumps({
+        'children': [{'type': 'MainContainer', 'children': [
+            {'type': 'LineList', 'props': {'items': [CARD] * 40}}]}]}),
+}
+
+
+class FakeResponse(object):
+    status_code = 200
+    headers = {}
+    encoding = None
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode()
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession(object):
+
+    def get(self, url, **kwargs):
+        return FakeResponse(RESPONSES['api' if '/api/' in url else 'topic'])
+
+
+def child(mode):
+    start = time.perf_counter()
+    sys.path[:0] = [STUBS, ROOT]
+    query = urlencode(MODES[mode])
+    sys.argv = ['plugin://plugin.video.cc.com/', '1', f"?{query}" if query else '']
+
+    from resources.lib import main
+    imported = time.perf_counter()
+
+    from resources.lib import comedycentral
+    comedycentral.getSession = FakeSession
+
+    import xbmcplugin
+    try:
+        main.ComedyCentral().main()
+    except SystemExit:
+        pass
+    print(json.dumps({
+        'import': imported - start,
+        'first': (xbmcplugin.FIRST_ITEM or time.perf_counter()) - start,
+        'items': len(xbmcplugin.ITEMS),
+        'heavy': [x for x in HEAVY if x in sys.modules],
+    }))
+
+
+def run(mode):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', mode],
+        capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('--child')
+    parser.add_argument('modes', nargs='*', default=list(MODES))
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    print(f"{'mode':<10} {'process ms':>10} {'import ms':>10} {'1st item ms':>12} {'items':>6}  heavy imports")
+    for mode in args.modes:
+        results = [run(mode) for _ in range(args.runs)]
+        median = {k: statistics.median(x[k] for x in results) * 1000
+                  for k in ['process', 'import', 'first']}
+        print(f"{mode:<10} {median['process']:>10.1f} {median['import']:>10.1f} "
+              f"{median['first']:>12.1f} {results[0]['items']:>6}  "
+              f"{', '.join(results[0]['heavy']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Minimal stand-in of the Kodi xbmc module for the benchmarks."""
+import os
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+PLAYLIST_VIDEO = 1
+
+LOG_LEVEL = int(os.environ.get('BENCH_LOG_LEVEL', LOGERROR))
+# urls added to any playlist
+PLAYLIST_ITEMS = []
+
+
+def log(msg, level=LOGDEBUG):
+    if level >= LOG_LEVEL:
+        print(f"xbmc.log[{level}] {msg}")
+
+
+def executebuiltin(function, wait=False):
+    pass
+
+
+def getLocalizedString(id):
+    return f"#{id}"
+
+
+def getInfoLabel(label):
+    return ''
+
+
+def getGlobalIdleTime():
+    return 0
+
+
+def sleep(ms):
+    pass
+
+
+class Monitor(object):
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        return True
+
+
+class Player(object):
+
+    def isPlaying(self):
+        return False
+
+
+class PlayList(object):
+
+    def __init__(self, type):
+        self.items = []
+
+    def clear(self):
+        self.items = []
+
+    def add(self, url, listitem=None, index=-1):
+        self.items.append(url)
+        PLAYLIST_ITEMS.append(url)
+
+    def unshuffle(self):
+        pass
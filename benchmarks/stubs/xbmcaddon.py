@@ -0,0 +1,48 @@
+"""Minimal stand-in of the Kodi xbmcaddon module for the benchmarks.
+Settings default to the values of resources/settings.xml and can be
+overridden with BENCH_SETTING_<id> environment variables."""
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+PROFILE = os.environ.get('BENCH_PROFILE') or os.path.join(
+    tempfile.gettempdir(), 'plugin.video.cc.com-bench')
+
+
+def _defaults():
+    tree = ET.parse(os.path.join(ROOT, 'resources', 'settings.xml'))
+    return {
+        x.get('id'): (x.findtext('default') or '')
+        for x in tree.iter('setting')}
+
+
+class Addon(object):
+    _settings = None
+
+    def __init__(self, id=None):
+        if Addon._settings is None:
+            Addon._settings = _defaults()
+            Addon._settings.update({
+                k[len('BENCH_SETTING_'):]: v for k, v in os.environ.items()
+                if k.startswith('BENCH_SETTING_')})
+
+    def getAddonInfo(self, id):
+        return {
+            'id': 'plugin.video.cc.com',
+            'name': 'Comedy Central',
+            'version': 'bench',
+            'path': ROOT,
+            'profile': PROFILE,
+            'icon': os.path.join(ROOT, 'resources', 'icon.png'),
+            'fanart': os.path.join(ROOT, 'resources', 'fanart.png'),
+        }.get(id, '')
+
+    def getSetting(self, id):
+        return self._settings.get(id, '')
+
+    def setSetting(self, id, value):
+        self._settings[id] = value
+
+    def getLocalizedString(self, id):
+        return f"#{id}"
@@ -0,0 +1,55 @@
+"""Minimal stand-in of the Kodi xbmcgui module for the benchmarks."""
+
+
+class ListItem(object):
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.properties = {}
+
+    def setArt(self, values):
+        self.art = values
+
+    def setInfo(self, type, infoLabels):
+        self.info = infoLabels
+
+    def setSubtitles(self, subtitleFiles):
+        self.subtitles = subtitleFiles
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def setContentLookup(self, enable):
+        pass
+
+    def setMimeType(self, mimetype):
+        pass
+
+
+class Dialog(object):
+
+    def notification(self, heading, message, icon='', time=0, sound=True):
+        print(f"notification: {message}")
+
+    def ok(self, heading, message):
+        return True
+
+    def input(self, heading, defaultt='', type=0):
+        return defaultt
+
+
+class Window(object):
+    _properties = {}
+
+    def __init__(self, existingWindowId=-1):
+        pass
+
+    def getProperty(self, key):
+        return self._properties.get(key, '')
+
+    def setProperty(self, key, value):
+        self._properties[key] = value
+
+    def clearProperty(self, key):
+        self._properties.pop(key, None)
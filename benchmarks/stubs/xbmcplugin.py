@@ -0,0 +1,40 @@
+"""Minimal stand-in of the Kodi xbmcplugin module for the benchmarks.
+Every item added is recorded in ITEMS, with the time of the first one."""
+import time
+
+ITEMS = []
+FIRST_ITEM = None
+END = None
+RESOLVED = None
+
+
+def _added(count):
+    global FIRST_ITEM
+    if FIRST_ITEM is None and count:
+        FIRST_ITEM = time.perf_counter()
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    _added(1)
+    ITEMS.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    _added(len(items))
+    ITEMS.extend(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    global END
+    END = time.perf_counter()
+
+
+def setContent(handle, content):
+    pass
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    global RESOLVED
+    RESOLVED = time.perf_counter()
@@ -0,0 +1,5 @@
+"""Minimal stand-in of the Kodi xbmcvfs module for the benchmarks."""
+
+
+def translatePath(path):
+    return path
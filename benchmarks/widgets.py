@@ -0,0 +1,82 @@
+"""
+Concurrent invocations opening the same directory, as the widgets
+of a skin home screen do.
+
+Starts N plugin processes at once with a cold cache for a scenario
+of the fixtures, every page request taking a fixed latency as cc.com
+would, and reports the wall time and the page requests of all of
+them. Ideally only one of the processes downloads each page.
+
+usage: python benchmarks/widgets.py [-n PROCESSES] [--latency S] [--fixtures DIR] [SCENARIO ...]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+sys.path[:0] = [STUBS, ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+from fixtures import Fixtures  # noqa: E402
+from fixtures import createSynthetic  # noqa: E402
+from modes import clearCache  # noqa: E402
+from modes import runOnce  # noqa: E402
+
+
+def child(folder, name, latency):
+    fixtures = Fixtures(folder)
+    fixtures.install()
+    get = fixtures.get
+
+    def slowGet(url, **kwargs):
+        time.sleep(latency)
+        return get(url, **kwargs)
+
+    fixtures.get = slowGet
+    scenario = next(x for x in fixtures.scenarios if x['name'] == name)
+    seconds, items = runOnce(scenario, False)
+    print(json.dumps({'seconds': seconds, 'items': items, 'requests': fixtures.requests}))
+
+
+def run(folder, name, processes, latency):
+    clearCache()
+    start = time.perf_counter()
+    children = [subprocess.Popen(
+        [sys.executable, __file__, '--child', name, '--fixtures', folder,
+         '--latency', str(latency)], stdout=subprocess.PIPE, text=True)
+        for _ in range(processes)]
+    results = [json.loads(x.communicate()[0].strip().splitlines()[-1]) for x in children]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--processes', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--fixtures')
+    parser.add_argument('--child')
+    parser.add_argument('scenarios', nargs='*', default=['showsList', 'loadTopic', 'loadItems'])
+    args = parser.parse_args()
+    sys.argv = ['plugin://plugin.video.cc.com/', '1', '']
+
+    folder = args.fixtures
+    if not folder:
+        folder = os.path.join(tempfile.gettempdir(), 'plugin.video.cc.com-fixtures')
+        createSynthetic(folder)
+    if args.child:
+        return child(folder, args.child, args.latency)
+
+    print(f"{'scenario':<14} {'processes':>9} {'wall ms':>9} {'slowest ms':>11} {'requests':>9}")
+    for name in args.scenarios:
+        wall, results = run(folder, name, args.processes, args.latency)
+        print(f"{name:<14} {args.processes:>9} {wall * 1000:>9.1f} "
+              f"{max(x['seconds'] for x in results) * 1000:>11.1f} "
+              f"{sum(x['requests'] for x in results):>9}")
+
+
+if __name__ == '__main__':
+    main()
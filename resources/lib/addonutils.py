@@ -9,38 +9,93 @@ import xbmcgui
 import xbmcplugin
 import xbmcvfs
 
-ADDON = xbmcaddon.Addon()
-ID = ADDON.getAddonInfo('id')
-NAME = ADDON.getAddonInfo('name')
-VERSION = ADDON.getAddonInfo('version')
-ICON = ADDON.getAddonInfo('icon')
-FANART = ADDON.getAddonInfo('fanart')
-PATH = ADDON.getAddonInfo('path')
-DATA_PATH = ADDON.getAddonInfo('profile')
-PATH_T = xbmcvfs.translatePath(PATH)
-DATA_PATH_T = xbmcvfs.translatePath(DATA_PATH)
-IMAGE_PATH_T = os.path.join(PATH_T, 'resources', 'media')
-LANGUAGE = ADDON.getLocalizedString
+# ADDON, its infos and paths are created on first access by __getattr__
+ADDON_INFOS = {
+    'ID': 'id',
+    'NAME': 'name',
+    'VERSION': 'version',
+    'ICON': 'icon',
+    'FANART': 'fanart',
+    'PATH': 'path',
+    'DATA_PATH': 'profile',
+}
+ADDON_PATHS = {
+    'PATH_T': lambda: xbmcvfs.translatePath(_lazy('PATH')),
+    'DATA_PATH_T': lambda: xbmcvfs.translatePath(_lazy('DATA_PATH')),
+    'IMAGE_PATH_T': lambda: os.path.join(_lazy('PATH_T'), 'resources', 'media'),
+}
 KODILANGUAGE = xbmc.getLocalizedString
 
-HANDLE = int(sys.argv[1])
+# max items sent to Kodi with a single addDirectoryItems
+LIST_CHUNK = 50
+
+# services are started without handle and params
+HANDLE = int(sys.argv[1]) if len(sys.argv) > 1 else -1
+
+
+def _lazy(name):
+    """
+    Create the addon related module attributes on first access,
+    so modes that don't use them don't pay for them.
+    """
+    if name in globals():
+        return globals()[name]
+    if name == 'ADDON':
+        value = xbmcaddon.Addon()
+    elif name == 'LANGUAGE':
+        value = _lazy('ADDON').getLocalizedString
+    elif name in ADDON_INFOS:
+        value = _lazy('ADDON').getAddonInfo(ADDON_INFOS[name])
+    elif name in ADDON_PATHS:
+        value = ADDON_PATHS[name]()
+    else:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+    globals()[name] = value
+    return value
+
+
+__getattr__ = _lazy
 
 
 def executebuiltin(func, block=False):
     xbmc.executebuiltin(func, block)
 
 
+def getInfoLabel(label):
+    return xbmc.getInfoLabel(label)
+
+
+def isPlaying():
+    return xbmc.Player().isPlaying()
+
+
+def getIdleTime():
+    return xbmc.getGlobalIdleTime()
+
+
+def getWindowProperty(key):
+    return xbmcgui.Window(10000).getProperty(f"{_lazy('ID')}.{key}")
+
+
+def setWindowProperty(key, value):
+    xbmcgui.Window(10000).setProperty(f"{_lazy('ID')}.{key}", str(value))
+
+
+def clearWindowProperty(key):
+    xbmcgui.Window(10000).clearProperty(f"{_lazy('ID')}.{key}")
+
+
 def notify(msg):
-    xbmcgui.Dialog().notification(NAME, msg, ICON)
+    xbmcgui.Dialog().notification(_lazy('NAME'), msg, _lazy('ICON'))
 
 
 def log(msg, level=xbmc.LOGDEBUG):
     # DEBUG = 0, INFO = 1, WARNING = 2, ERROR = 3, FATAL = 4
-    xbmc.log(f"[{ID}/{VERSION}] {msg}", level=level)
+    xbmc.log(f"[{_lazy('ID')}/{_lazy('VERSION')}] {msg}", level=level)
 
 
 def getParams():
-    if not sys.argv[2]:
+    if len(sys.argv) < 3 or not sys.argv[2]:
         return {}
     return dict(parse_qsl(sys.argv[2][1:]))
 
@@ -55,7 +110,7 @@ def parameters(p, host=sys.argv[0]):
 
 
 def getSetting(setting):
-    return ADDON.getSetting(setting).strip()
+    return _lazy('ADDON').getSetting(setting).strip()
 
 
 def getSettingAsBool(setting):
@@ -76,13 +131,18 @@ def getSettingAsInt(setting):
 
 
 def setSetting(setting, value):
-    ADDON.setSetting(id=setting, value=str(value))
+    _lazy('ADDON').setSetting(id=setting, value=str(value))
 
 
-def showOkDialog(line, heading=NAME):
+def showOkDialog(line, heading=None):
+    heading = heading or _lazy('NAME')
     xbmcgui.Dialog().ok(heading, line)
 
 
+def getKeyboardInput(heading):
+    return xbmcgui.Dialog().input(heading)
+
+
 def createListItem(
         label='', params=None, label2=None,
         thumb=None, fanart=None, poster=None, arts={},
@@ -106,7 +166,7 @@ def createListItem(
     return item
 
 
-def addListItem(
+def createDirectoryItem(
         label='', params=None, label2=None,
         thumb=None, fanart=None, poster=None, arts={},
         videoInfo=None, properties={}, isFolder=True,
@@ -120,10 +180,66 @@ def addListItem(
         thumb=thumb, fanart=fanart, poster=poster, arts=arts,
         videoInfo=videoInfo, properties=properties, isFolder=isFolder,
         path=path, subs=subs)
+    return url, item, isFolder
+
+
+def addListItem(
+        label='', params=None, label2=None,
+        thumb=None, fanart=None, poster=None, arts={},
+        videoInfo=None, properties={}, isFolder=True,
+        path=None, subs=None):
+    url, item, isFolder = createDirectoryItem(
+        label=label, params=params, label2=label2,
+        thumb=thumb, fanart=fanart, poster=poster, arts=arts,
+        videoInfo=videoInfo, properties=properties, isFolder=isFolder,
+        path=path, subs=subs)
     return xbmcplugin.addDirectoryItem(
         handle=HANDLE, url=url, listitem=item, isFolder=isFolder)
 
 
+def addListItems(items, chunk=LIST_CHUNK, total=None):
+    """
+    Add the (url, listitem, isFolder) items with addDirectoryItems,
+    a list is sent to Kodi in one call, longer ones in chunks
+    as they are produced. Kodi gets the total number of items
+    when known: from total, the length of items, or if they all
+    fit in one call.
+
+    :param      items:  The items
+    :type       items:  iterable
+    :param      chunk:  max items sent in one call
+    :type       chunk:  int
+    :param      total:  number of items, if known
+    :type       total:  int
+
+    :returns:   number of items added
+    :rtype:     int
+    """
+    if total is None and hasattr(items, '__len__'):
+        total = len(items)
+    batch = []
+    added = 0
+    for item in items:
+        batch.append(item)
+        if len(batch) >= chunk:
+            added += len(batch)
+            if total:
+                xbmcplugin.addDirectoryItems(HANDLE, batch, totalItems=total)
+            else:
+                xbmcplugin.addDirectoryItems(HANDLE, batch)
+            batch = []
+    if batch:
+        if not total and not added:
+            # the whole list in one call
+            total = len(batch)
+        added += len(batch)
+        if total:
+            xbmcplugin.addDirectoryItems(HANDLE, batch, totalItems=total)
+        else:
+            xbmcplugin.addDirectoryItems(HANDLE, batch)
+    return added
+
+
 def getPlaylist(type=xbmc.PLAYLIST_VIDEO, clear=True):
     plst = xbmc.PlayList(type)
     if clear:
@@ -159,5 +275,3 @@ def endScript(message=None, loglevel=2, closedir=True, exit=True):
     if exit:
         sys.exit(0)
 
-
-log(f"Starting with command \"{sys.argv[2]}\"", 1)
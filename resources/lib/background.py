@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+
+
+class TaskQueue(object):
+    """
+    Bounded queue of tasks executed by background threads.
+    Every task returns the number of bytes it used, no new task is
+    started once the byte budget is spent or the queue is cancelled.
+    """
+
+    def __init__(self, workers=1, maxsize=4, budget=0):
+        """
+        :param      workers:  max number of worker threads
+        :type       workers:  int
+        :param      maxsize:  max number of pending tasks
+        :type       maxsize:  int
+        :param      budget:   max bytes used by all the tasks, 0 for no limit
+        :type       budget:   int
+        """
+        self.budget = budget
+        self.used = 0
+        self._workers = workers
+        self._threads = []
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def exhausted(self):
+        return bool(self.budget) and self.used >= self.budget
+
+    def submit(self, func, *args):
+        """
+        Queue func(*args) to be executed in background.
+
+        :returns:   False if the task has been discarded
+        :rtype:     bool
+        """
+        if self.cancelled or self.exhausted:
+            return False
+        try:
+            self._queue.put_nowait((func, args))
+        except queue.Full:
+            return False
+        with self._lock:
+            if len(self._threads) < self._workers:
+                thread = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        return True
+
+    def _run(self):
+        while not self.cancelled:
+            try:
+                task = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._closing.is_set():
+                    break
+                continue
+            if task is None:
+                break
+            func, args = task
+            if self.cancelled or self.exhausted:
+                continue
+            try:
+                used = func(*args) or 0
+            except Exception:
+                used = 0
+            with self._lock:
+                self.used += used
+
+    def cancel(self):
+        """
+        Discard the pending tasks, running ones are left to complete.
+        """
+        self._cancel.set()
+
+    def close(self, grace=0):
+        """
+        Let the pending tasks run for up to grace seconds,
+        then cancel the remaining ones.
+
+        :param      grace:  seconds to wait for pending tasks
+        :type       grace:  float
+        """
+        self._closing.set()
+        # wake up the idle workers, the ones not woken up exit at the next poll
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + grace
+        for thread in list(self._threads):
+            thread.join(max(0, deadline - time.monotonic()))
+        self.cancel()
@@ -0,0 +1,319 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+CACHE_FILE = 'cache.db'
+# share of the byte budget of every namespace, others use the default
+NAMESPACES = {
+    'pages': 0.55,
+    'listings': 0.1,
+    'playback': 0.2,
+    'videoInfo': 0.1,
+    'mgids': 0.05,
+}
+# max values kept decoded in memory
+MEMORY_ITEMS = 64
+# seconds to wait for another invocation writing the cache
+TIMEOUT = 5
+COMPRESS_LEVEL = 6
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        namespace TEXT,
+        value BLOB,
+        size INTEGER,
+        expires REAL,
+        accessed REAL)""",
+    'CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed)',
+    """CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT,
+        expires REAL)""",
+]
+
+
+def namespace(key):
+    """
+    Namespace of a CC cache key: pages, listings, videoInfo,
+    playback or mgids.
+
+    :param      key:  The key
+    :type       key:  str
+
+    :returns:   namespace
+    :rtype:     str
+    """
+    name = key.split('[', 1)[0]
+    if name.endswith('_videoInfo'):
+        return 'videoInfo'
+    if name.endswith('_playback'):
+        return 'playback'
+    if name.endswith('_mgid'):
+        return 'mgids'
+    if name.endswith(('_listing', '_stamp')):
+        return 'listings'
+    return 'pages'
+
+
+class Cache(object):
+    """
+    Two tiers cache with the get/set interface of SimpleCache:
+    decoded values are kept in memory for the invocation, and stored
+    zlib compressed in a SQLite database. The database is kept under
+    budget bytes evicting the least recently used entries of each
+    namespace, see evict.
+    Leases let the threads and invocations sharing the database
+    agree on who downloads a page, see acquire.
+    """
+
+    def __init__(self, path, budget):
+        self.path = path
+        self.budget = budget
+        self.stats = dict.fromkeys(['memory', 'hits', 'misses', 'writes', 'evictions'], 0)
+        self._db = None
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._accessed = {}
+        self._owner = f"{os.getpid()}.{id(self)}"
+        self._leases = set()
+
+    @property
+    def db(self):
+        """
+        The connection, shared by the threads of CC
+        """
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=TIMEOUT, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('PRAGMA synchronous = NORMAL')
+            for statement in SCHEMA:
+                self._db.execute(statement)
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, expires, data):
+        self._memory[key] = (expires, data)
+        self._memory.move_to_end(key)
+        if len(self._memory) > MEMORY_ITEMS:
+            self._memory.popitem(last=False)
+
+    def get(self, key, json_data=False, memory=True):
+        """
+        The value of key, None if missing or expired.
+
+        :param      key:        The key
+        :type       key:        str
+        :param      json_data:  kept for SimpleCache compatibility
+        :type       json_data:  bool
+        :param      memory:     use the value kept in memory, if any
+        :type       memory:     bool
+        """
+        now = time.time()
+        with self._lock:
+            if memory and key in self._memory and self._memory[key][0] > now:
+                self.stats['memory'] += 1
+                self._memory.move_to_end(key)
+                return self._memory[key][1]
+            row = self.db.execute(
+                'SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            # access times are written by close
+            self._accessed[key] = now
+        data = json.loads(zlib.decompress(row[0]))
+        with self._lock:
+            self._remember(key, row[1], data)
+        return data
+
+    def set(self, key, data, expiration=datetime.timedelta(days=30), json_data=False):
+        """
+        Store the value of key for the expiration period.
+
+        :param      key:         The key
+        :type       key:         str
+        :param      data:        json serializable value
+        :type       data:        object
+        :param      expiration:  validity
+        :type       expiration:  datetime.timedelta
+        :param      json_data:   kept for SimpleCache compatibility
+        :type       json_data:   bool
+        """
+        now = time.time()
+        expires = now + expiration.total_seconds()
+        value = zlib.compress(
+            json.dumps(data, separators=(',', ':')).encode(), COMPRESS_LEVEL)
+        with self._lock:
+            self._remember(key, expires, data)
+            self._accessed.pop(key, None)
+            with self.db:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, namespace(key), value, len(value), expires, now))
+            self.stats['writes'] += 1
+
+    def setMany(self, items, expiration=datetime.timedelta(days=30), replace=True):
+        """
+        Store the values of many keys, in one transaction.
+
+        :param      items:       key and json serializable value
+        :type       items:       dict
+        :param      expiration:  validity
+        :type       expiration:  datetime.timedelta
+        :param      replace:     replace the values not expired yet
+        :type       replace:     bool
+        """
+        now = time.time()
+        expires = now + expiration.total_seconds()
+        if not replace:
+            items = dict(items)
+            keys = list(items)
+            with self._lock:
+                # in chunks, under the limit of sql variables
+                for n in range(0, len(keys), 500):
+                    chunk = keys[n:n + 500]
+                    for (key,) in self.db.execute(
+                            f"SELECT key FROM entries WHERE expires > ? AND key IN "
+                            f"({', '.join('?' * len(chunk))})", [now] + chunk):
+                        del items[key]
+        rows = []
+        for key, data in items.items():
+            value = zlib.compress(
+                json.dumps(data, separators=(',', ':')).encode(), COMPRESS_LEVEL)
+            rows.append((key, namespace(key), value, len(value), expires, now))
+        if not rows:
+            return
+        with self._lock:
+            for key in items:
+                self._memory.pop(key, None)
+                self._accessed.pop(key, None)
+            with self.db:
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self.stats['writes'] += len(rows)
+
+    def acquire(self, name, seconds):
+        """
+        Take the lease of name for the calling thread, if not held by
+        another one. Leases held longer than seconds are considered
+        stale, left by a crashed invocation, and taken over.
+
+        :param      name:     The name
+        :type       name:     str
+        :param      seconds:  validity
+        :type       seconds:  float
+
+        :returns:   True if taken
+        :rtype:     bool
+        """
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute('DELETE FROM leases WHERE name = ? AND expires <= ?', (name, now))
+            owner = f"{self._owner}.{threading.get_ident()}"
+            if not self.db.execute(
+                    'INSERT OR IGNORE INTO leases VALUES (?, ?, ?)',
+                    (name, owner, now + seconds)).rowcount:
+                return False
+            self._leases.add((name, owner))
+            return True
+
+    def release(self, name):
+        """
+        Release the lease of name, if held by the calling thread.
+
+        :param      name:  The name
+        :type       name:  str
+        """
+        lease = (name, f"{self._owner}.{threading.get_ident()}")
+        with self._lock:
+            if lease not in self._leases:
+                return
+            self._leases.discard(lease)
+            with self.db:
+                self.db.execute('DELETE FROM leases WHERE name = ? AND owner = ?', lease)
+
+    def used(self):
+        """
+        Bytes used by the database, free pages excluded
+
+        :returns:   bytes
+        :rtype:     int
+        """
+        pages, free, size = [
+            self.db.execute(f"PRAGMA {x}").fetchone()[0]
+            for x in ['page_count', 'freelist_count', 'page_size']]
+        return (pages - free) * size
+
+    def evict(self):
+        """
+        Delete the expired entries and the least recently used ones
+        of the namespaces over their share of the budget.
+
+        :returns:   number of entries deleted
+        :rtype:     int
+        """
+        deleted = 0
+        with self._lock, self.db:
+            deleted += self.db.execute(
+                'DELETE FROM entries WHERE expires <= ?', (time.time(),)).rowcount
+            sizes = self.db.execute(
+                'SELECT namespace, SUM(size) FROM entries GROUP BY namespace').fetchall()
+            for name, size in sizes:
+                excess = size - self.budget * NAMESPACES.get(name, 0.1)
+                if excess <= 0:
+                    continue
+                keys = []
+                for key, entrySize in self.db.execute(
+                        'SELECT key, size FROM entries WHERE namespace = ? '
+                        'ORDER BY accessed', (name,)):
+                    keys.append((key,))
+                    excess -= entrySize
+                    if excess <= 0:
+                        break
+                self.db.executemany('DELETE FROM entries WHERE key = ?', keys)
+                deleted += len(keys)
+        self.stats['evictions'] += deleted
+        return deleted
+
+    def clear(self):
+        """
+        Delete every entry.
+        """
+        with self._lock, self.db:
+            self.db.execute('DELETE FROM entries')
+            self._memory.clear()
+            self._accessed.clear()
+
+    def close(self, evict=True):
+        """
+        Save the access times of the entries read, used by the LRU
+        eviction, evict if requested and the database is over budget,
+        release the leases left and close the database.
+
+        :param      evict:  run evict
+        :type       evict:  bool
+        """
+        with self._lock:
+            if self._db is None:
+                return
+            if self._accessed:
+                with self.db:
+                    self.db.executemany(
+                        'UPDATE entries SET accessed = ? WHERE key = ?',
+                        [(v, k) for k, v in self._accessed.items()])
+                self._accessed.clear()
+            if evict and self.stats['writes'] and self.used() > self.budget:
+                self.evict()
+            if self._leases:
+                with self.db:
+                    self.db.executemany(
+                        'DELETE FROM leases WHERE name = ? AND owner = ?', self._leases)
+                self._leases.clear()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,240 @@
+import json
+import sqlite3
+import time
+
+# bump when the schema changes, the catalog is rebuilt
+SCHEMA_VERSION = 1
+# seconds to wait for another invocation writing the catalog
+TIMEOUT = 5
+# unchanged items are written again only to refresh their update
+# time once a day, items not listed for MAX_DAYS are deleted and
+# at most MAX_ITEMS are kept, the least recently listed are deleted
+REFRESH_SECONDS = 24 * 3600
+MAX_DAYS = 90
+MAX_ITEMS = 10000
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS items (
+        url TEXT PRIMARY KEY,
+        mode TEXT,
+        mediatype TEXT,
+        label TEXT,
+        title TEXT,
+        show TEXT,
+        season INTEGER,
+        episode INTEGER,
+        mgid TEXT,
+        aired TEXT,
+        duration INTEGER,
+        plot TEXT,
+        infos TEXT,
+        updated INTEGER)""",
+    'CREATE INDEX IF NOT EXISTS items_aired ON items (aired)',
+    'CREATE INDEX IF NOT EXISTS items_updated ON items (updated)',
+]
+FTS_SCHEMA = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5('
+    'label, show, plot, content=items, content_rowid=rowid)')
+# the other columns are taken from these ones
+COMPARED = ['mode', 'label', 'mgid', 'infos']
+COLUMNS = [
+    'url', 'mode', 'mediatype', 'label', 'title', 'show', 'season',
+    'episode', 'mgid', 'aired', 'duration', 'plot', 'infos', 'updated']
+
+
+class Catalog(object):
+    """
+    Index of the shows and videos listed by the plugin, kept in
+    a SQLite database to be searched without going to the network.
+    Uses a FTS5 index if available, LIKE queries otherwise.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+        self.fts = False
+
+    @property
+    def db(self):
+        """
+        The connection, the schema is created on first use
+        """
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=TIMEOUT)
+            self._db.row_factory = sqlite3.Row
+            # readers don't block the writer, commits don't wait for fsync
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('PRAGMA synchronous = NORMAL')
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self._db.executescript(
+                    'DROP TABLE IF EXISTS items_fts; DROP TABLE IF EXISTS items;'
+                    f"PRAGMA user_version = {SCHEMA_VERSION};")
+            for statement in SCHEMA:
+                self._db.execute(statement)
+            try:
+                self._db.execute(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.fts = False
+            self._db.commit()
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _row(self, infos):
+        params = infos['params']
+        videoInfo = infos.get('videoInfo') or {}
+        return {
+            'url': params['url'],
+            'mode': params['mode'],
+            'mediatype': videoInfo.get('mediatype'),
+            'label': infos['label'],
+            'title': videoInfo.get('title'),
+            'show': videoInfo.get('tvshowtitle'),
+            'season': videoInfo.get('season'),
+            'episode': videoInfo.get('episode'),
+            'mgid': params.get('mgid'),
+            'aired': videoInfo.get('aired'),
+            'duration': videoInfo.get('duration'),
+            'plot': videoInfo.get('plot'),
+            'infos': json.dumps({
+                'name': params.get('name'),
+                'videoInfo': videoInfo,
+                'arts': infos.get('arts'),
+            }, separators=(',', ':')),
+            'updated': int(time.time()),
+        }
+
+    def _changed(self, rows):
+        """
+        The rows new or different from the stored ones, or not
+        updated for REFRESH_SECONDS.
+        """
+        db = self.db
+        stored = {}
+        urls = list(rows)
+        # in chunks, under the limit of sql variables
+        for n in range(0, len(urls), 500):
+            chunk = urls[n:n + 500]
+            for row in db.execute(
+                    f"SELECT * FROM items WHERE url IN ({', '.join('?' * len(chunk))})", chunk):
+                stored[row['url']] = row
+        changed = []
+        for url, row in rows.items():
+            old = stored.get(url)
+            if old is None or old['updated'] < row['updated'] - REFRESH_SECONDS or any(
+                    old[x] != row[x] for x in COMPARED):
+                changed.append(row)
+        return changed
+
+    def add(self, items):
+        """
+        Add or update the items listed by the plugin, only the new
+        or changed ones are written.
+
+        :param      items:  The items, as yielded by CC
+        :type       items:  list
+
+        :returns:   number of rows written
+        :rtype:     int
+        """
+        # one row per url, the fts index can't get the same rowid twice
+        rows = self._changed({x['params']['url']: self._row(x) for x in items})
+        if not rows:
+            return 0
+        db = self.db
+        with db:
+            if self.fts:
+                # external content tables are updated deleting the old values
+                db.executemany(
+                    'INSERT INTO items_fts (items_fts, rowid, label, show, plot) '
+                    'SELECT \'delete\', rowid, label, show, plot FROM items WHERE url = ?',
+                    [(x['url'],) for x in rows])
+            db.executemany(
+                f"INSERT OR REPLACE INTO items ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join(':' + x for x in COLUMNS)})", rows)
+            if self.fts:
+                db.executemany(
+                    'INSERT INTO items_fts (rowid, label, show, plot) '
+                    'SELECT rowid, label, show, plot FROM items WHERE url = ?',
+                    [(x['url'],) for x in rows])
+            self._prune()
+        return len(rows)
+
+    def _prune(self):
+        """
+        Delete the items not listed for MAX_DAYS and the least
+        recently listed ones over MAX_ITEMS.
+        """
+        db = self.db
+        where = (
+            'updated < ? OR rowid IN (SELECT rowid FROM items '
+            'ORDER BY updated DESC LIMIT -1 OFFSET ?)')
+        args = (int(time.time()) - MAX_DAYS * 24 * 3600, MAX_ITEMS)
+        if self.fts:
+            db.execute(
+                'INSERT INTO items_fts (items_fts, rowid, label, show, plot) '
+                f"SELECT 'delete', rowid, label, show, plot FROM items WHERE {where}", args)
+        db.execute(f"DELETE FROM items WHERE {where}", args)
+
+    def _items(self, rows):
+        for row in rows:
+            infos = json.loads(row['infos'])
+            yield {
+                'label': row['label'],
+                'params': {
+                    'mode': row['mode'],
+                    'url': row['url'],
+                    'name': infos['name'],
+                    'mgid': row['mgid'],
+                },
+                'videoInfo': infos['videoInfo'],
+                'arts': infos['arts'],
+                'playable': row['mode'] == 'PLAY',
+            }
+
+    def search(self, text, limit=100):
+        """
+        Items whose title, show or plot match all the words of text
+
+        :param      text:   The text
+        :type       text:   str
+        :param      limit:  max number of items
+        :type       limit:  int
+
+        :returns:   items, best matches first
+        :rtype:     generator
+        """
+        words = text.split()
+        if not words:
+            return
+        db = self.db
+        if self.fts:
+            # every word is a quoted prefix, so no FTS syntax gets through
+            query = ' '.join('"%s"*' % x.replace('"', '""') for x in words)
+            rows = db.execute(
+                'SELECT items.* FROM items_fts JOIN items ON items.rowid = items_fts.rowid '
+                'WHERE items_fts MATCH ? ORDER BY rank LIMIT ?', (query, limit))
+        else:
+            where = ' AND '.join(['(label LIKE ? OR show LIKE ? OR plot LIKE ?)'] * len(words))
+            args = [f"%{x}%" for x in words for _ in range(3)]
+            rows = db.execute(
+                f"SELECT * FROM items WHERE {where} ORDER BY aired DESC LIMIT ?", args + [limit])
+        yield from self._items(rows.fetchall())
+
+    def recent(self, limit=100):
+        """
+        Most recently aired episodes
+
+        :param      limit:  max number of items
+        :type       limit:  int
+
+        :returns:   items, most recent first
+        :rtype:     generator
+        """
+        rows = self.db.execute(
+            "SELECT * FROM items WHERE mode = 'PLAY' AND aired IS NOT NULL "
+            'ORDER BY aired DESC LIMIT ?', (limit,))
+        yield from self._items(rows.fetchall())
@@ -1,61 +1,253 @@
 import datetime
 import re
 import json
-import requests
+import os
+import random
+import threading
+import time
 
-from simplecache import SimpleCache
+from urllib.parse import urlsplit
 
 from resources.lib import addonutils
+from resources.lib import playback
+from resources.lib import trace
+from resources.lib.background import TaskQueue
+from resources.lib.page import Page
+from resources.lib.page import extractData
 from resources.lib.translate import translatedString as T
 
 
 TIMEOUT = 15
-QUALITY = addonutils.getSettingAsInt('Quality')
+# days the mgid of a video url is kept
+MGID_DAYS = 90
+# modes whose items are cached, until one of their pages changes
+LISTING_MODES = ['SHOWS', 'GENERIC', 'SEASON', 'EPISODES', 'EPISODES_ALL']
+# settings changing the items or the background work of a listing,
+# part of its cache key
+LISTING_SETTINGS = ['ParallelSeasons']
+# days an expired page is kept, to be revalidated with ETag/Last-Modified
+# or served when cc.com can't be reached
+REVALIDATE_DAYS = 7
+# retries of transient errors, waiting up to BACKOFF * 2^retry seconds
+RETRIES = 2
+BACKOFF = 0.5
+RETRY_STATUS = [429, 500, 502, 503, 504]
+# a page or a video is downloaded or resolved by one thread or
+# invocation at a time, the others wait up to LEASE_WAIT seconds for
+# it, checking the cache every LEASE_POLL seconds. Leases older than
+# LEASE_SECONDS are stale
+LEASE_SECONDS = 60
+LEASE_WAIT = 10
+LEASE_POLL = 0.05
+# not found pages are remembered for NEGATIVE_MINUTES
+NEGATIVE_STATUS = [404, 410]
+NEGATIVE_MINUTES = 10
+# failed requests in a row opening the circuit breaker of a host,
+# no request is sent to it for BREAKER_SECONDS
+BREAKER_FAILURES = 3
+BREAKER_SECONDS = 120
 QUALITIES = [360, 540, 720, 1080, 9999]
-DEVMODE = addonutils.getSettingAsBool('DevMode')
+# hours the bandwidth measured during a play is used by the next ones,
+# and seconds the measure can take once the first act is playing
+BANDWIDTH_HOURS = 24
+BANDWIDTH_GRACE = 10
+# acts resolved in the background once the first one is playing,
+# yt-dlp skips the ones past the end of the playlist
+MAX_ACTS = 20
+# threads downloading in background the season pages of a show,
+# and seconds they can keep working once the directory is done
+SEASON_WORKERS = 4
+SEASON_GRACE = 10
+# seconds given to Kodi to show the directory before resolving
+# and max seconds spent resolving once the directory is done
+SPECULATIVE_DELAY = 1
+SPECULATIVE_GRACE = 60
+# max pending pages and total bytes downloaded by the prefetcher
+PREFETCH_QUEUE = 4
+PREFETCH_BUDGET = 2 * 1024 * 1024
+# seconds the prefetcher can keep working once the directory is done
+PREFETCH_GRACE = 5
+# threads and max pages downloaded by loadAllItems
+ALL_WORKERS = 4
+ALL_MAX_PAGES = 25
+# connections kept open per host: the page loader threads, the main
+# one, the prefetcher and up to 3 speculative workers
+POOL_SIZE = max(SEASON_WORKERS, ALL_WORKERS) + 5
+# api urls end with /<page number>/<page size>
+PAGINATION = re.compile(r'^(.+/)(\d+)/(\d+)$')
 BASE_URL = 'https://www.cc.com'
 BASE_MGID = 'mgid:arc:video:comedycentral.com:'
 PAGES_CRUMB = ['topic', 'collections', 'shows']
-LANG = addonutils.LANGUAGE
+# catalog database in the addon profile and max items listed from it
+CATALOG_FILE = 'catalog.db'
+CATALOG_LIMIT = 100
+# labels are translated by getMainMenu
 MAIN_MENU = [{
-    'label': T('shows'),
+    'label': 'shows',
     'params': {
         'url': f"{BASE_URL}/api/shows/1/40",
         'mode': 'SHOWS',
     },
 }, {
-    'label': T('full.episodes'),
+    'label': 'full.episodes',
     'params': {
         'url': f"{BASE_URL}/api/episodes/1/40",
         'mode': 'EPISODES',
     },
 }, {
-    'label': T('standup'),
+    'label': 'standup',
     'params': {
         'url': f"{BASE_URL}/topic/stand-up",
         'mode': 'GENERIC',
-        'name': T('standup'),
+        'name': 'standup',
     },
 }, {
-    'label': T('digital.original'),
+    'label': 'digital.original',
     'params': {
         'url': f"{BASE_URL}/topic/digital-originals",
         'mode': 'GENERIC',
-        'name': T('digital.original'),
+        'name': 'digital.original',
+    },
+}, {
+    'label': 'recent',
+    'params': {
+        'mode': 'RECENT',
+    },
+}, {
+    'label': 'search',
+    'params': {
+        'mode': 'SEARCH',
     },
 }]
 
+# shared keep-alive session, created by getSession
+SESSION = None
+SESSION_LOCK = threading.Lock()
+
+
+def getSession():
+    """
+    Returns the shared session, requests is imported only
+    by the modes that go to the network.
+    urllib3 advertises brotli only if it can decode it.
+
+    :returns:   the session
+    :rtype:     requests.Session
+    """
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.request import ACCEPT_ENCODING
+
+            SESSION = requests.Session()
+            SESSION.headers.update({'Accept-Encoding': ACCEPT_ENCODING})
+            SESSION.mount('https://', HTTPAdapter(pool_maxsize=POOL_SIZE))
+    return SESSION
+
+
+class Settings(object):
+    """
+    Addon settings used by CC, each one is read on first access.
+    """
+    TYPES = {
+        'Quality': addonutils.getSettingAsInt,
+        'AdaptiveQuality': addonutils.getSettingAsBool,
+        'DevMode': addonutils.getSettingAsBool,
+        'Prefetch': addonutils.getSettingAsInt,
+        'ParallelSeasons': addonutils.getSettingAsBool,
+        'SpeculativeCount': addonutils.getSettingAsInt,
+        'SpeculativeWorkers': addonutils.getSettingAsInt,
+        'CacheSize': addonutils.getSettingAsInt,
+    }
+
+    def __getattr__(self, name):
+        if name not in self.TYPES:
+            raise AttributeError(name)
+        value = self.TYPES[name](name)
+        setattr(self, name, value)
+        return value
+
 
 class CC(object):
 
     def __init__(self):
+        self.settings = Settings()
+        self._cache = None
+        self._cacheLock = threading.Lock()
         self._log('__init__')
-        self.cache = SimpleCache()
+        self._pages = {}
+        self._prefetcher = None
+        self._prober = None
+        self._pageLoader = None
+        self._seasonLoader = None
+        self._seasons = []
+        self._speculative = []
+        self._videoInfo = {}
+        self._catalog = []
+        self._mgids = {}
+        self._stamps = {}
+        self._prefetched = []
+        self._resolver = None
+
+    @property
+    def resolver(self):
+        """
+        The yt-dlp resolver, one for the invocation
+        """
+        with self._cacheLock:
+            if self._resolver is None:
+                from resources.lib.resolver import Resolver
+
+                self._resolver = Resolver(self._log)
+        return self._resolver
+
+    @property
+    def cache(self):
+        """
+        The cache, created on first use
+        """
+        with self._cacheLock:
+            if self._cache is None:
+                from resources.lib.cache import CACHE_FILE
+                from resources.lib.cache import Cache
+
+                os.makedirs(addonutils.DATA_PATH_T, exist_ok=True)
+                self._cache = Cache(
+                    os.path.join(addonutils.DATA_PATH_T, CACHE_FILE),
+                    max(1, self.settings.CacheSize) * 1024 * 1024)
+        return self._cache
+
+    def close(self):
+        """
+        Ends the background work at the end of the invocation.
+        """
+        self._flushVideoInfo()
+        self._flushCatalog()
+        self._flushMgids()
+        if self._prefetcher:
+            self._prefetcher.close(PREFETCH_GRACE)
+            self._log(f"close, prefetched bytes = {self._prefetcher.used}")
+        if self._pageLoader:
+            self._pageLoader.shutdown()
+        if self._prober:
+            self._prober.close(BANDWIDTH_GRACE)
+        if self._seasonLoader:
+            self._seasonLoader.close(SEASON_GRACE)
+            self._log(f"close, season bytes = {self._seasonLoader.used}")
+        if self._speculative:
+            self._speculate()
+        if self._cache is not None:
+            self._cache.close()
+            self._log(f"close, cache stats = {self._cache.stats}")
+            for name, value in self._cache.stats.items():
+                trace.count(f"store.{name}", value)
 
     def _log(self, msg, level=0):
         """
         Log message
-        If DEVMODE is enabled, all debug messages are raised to INFO,
+        If DevMode is enabled, all debug messages are raised to INFO,
         so everithing from the plugin is visible without
         activating Debug Log in Kodi.
 
@@ -64,46 +256,278 @@ class CC(object):
         :param      level:  loglevel
         :type       level:  int
         """
-        if DEVMODE:
+        if self.settings.DevMode:
             addonutils.log(msg, 1 if level == 0 else level)
         elif level >= 3:
             addonutils.log(msg, level)
 
-    def _openURL(self, url, hours=24):
+    def _openURL(self, url, hours=24, parse=None):
         """
         Get url content from cache or from source
         depending if cache is available or not.
+        If parse is provided the cache holds its result instead
+        of the raw content.
 
         :param      url:    The url
         :type       url:    str
         :param      hours:  cache retention period in hours
         :type       hours:  int
+        :param      parse:  function applied to the content before caching
+        :type       parse:  callable
 
         :returns:   url content
         :rtype:     str
         """
         self._log(f"openURL, url = {url}", 1)
         try:
-            cacheresponse = self.cache.get(
-                f"{addonutils.ID}._openURL, url = {url}")
-            if not cacheresponse:
-                self._log('openURL, no cache found')
-                response = requests.get(url, timeout=TIMEOUT)
-                if response.status_code == requests.codes.ok:
-                    response.encoding = 'utf-8'
-                    self.cache.set(
-                        f"{addonutils.ID}._openURL, url = {url}",
-                        response.text,
-                        expiration=datetime.timedelta(hours=hours))
-                else:
-                    response.raise_for_status()
-            return self.cache.get(f"{addonutils.ID}._openURL, url = {url}")
+            with trace.span('openURL'):
+                record = self._openRecord(url, hours, parse)[0]
+            self._usePage(self._recordKey(url, parse), record)
+            return record['body']
+        except ValueError as e:
+            self._log(f"openURL, {url}: {e}", 3)
+            addonutils.notify(T('error.no.json'))
+            addonutils.endScript()
         except Exception as e:
-            self.cache = None
             self._log(f"openURL Failed! {e}", 3)
             addonutils.notify(T('error.openurl'))
             addonutils.endScript()
 
+    def _recordKey(self, url, parse=None):
+        return f"{addonutils.ID}.{'_openURL' if parse is None else parse.__name__}[{url}]"
+
+    def _openRecord(self, url, hours=24, parse=None, refresh=False):
+        """
+        Get the cache record of the url, downloading it if needed.
+        Expired entries are kept with their ETag/Last-Modified
+        and revalidated, a 304 response only extends their validity.
+        When cc.com fails, or its circuit breaker is open, the expired
+        entry is returned if any. Not found pages are cached
+        for NEGATIVE_MINUTES. If another thread or invocation is
+        downloading the same url, its result is waited for.
+        Raises on network errors.
+
+        :param      url:      The url
+        :type       url:      str
+        :param      hours:    cache retention period in hours
+        :type       hours:    int
+        :param      parse:    function applied to the content before caching
+        :type       parse:    callable
+        :param      refresh:  revalidate the entry even if not expired
+        :type       refresh:  bool
+
+        :returns:   cache record and number of bytes downloaded
+        :rtype:     tuple
+        """
+        key = self._recordKey(url, parse)
+        record = self.cache.get(key, json_data=True) or {}
+        if not refresh and record.get('expires', 0) > time.time():
+            if 'missing' in record:
+                trace.count('cache.negative')
+                raise IOError(f"HTTP {record['missing']} (cached) for url: {url}")
+            trace.count('cache.hit')
+            return record, 0
+
+        trace.count('cache.miss')
+        self._log(f"openURL, no valid cache found for {url}")
+        host = urlsplit(url).netloc
+        if self._breakerOpen(host):
+            return self._staleRecord(
+                url, record, IOError(f"circuit breaker open for {host}"))
+        if not self.cache.acquire(key, LEASE_SECONDS):
+            trace.count('cache.coalesced')
+            with trace.span('lease'):
+                leased = self._awaitRecord(key)
+            if leased:
+                if 'missing' in leased:
+                    raise IOError(f"HTTP {leased['missing']} (cached) for url: {url}")
+                return leased, 0
+        try:
+            return self._fetchRecord(url, key, record, hours, parse)
+        finally:
+            self.cache.release(key)
+
+    def _awaitRecord(self, key, valid=None):
+        """
+        Wait for the thread or invocation holding the lease of key
+        to cache it. The lease is taken if released without a valid
+        record, like after a failure.
+
+        :param      key:    The cache key
+        :type       key:    str
+        :param      valid:  check of the record, not expired by default
+        :type       valid:  callable
+
+        :returns:   cache record, None if to be downloaded
+        :rtype:     dict
+        """
+        deadline = time.time() + LEASE_WAIT
+        while time.time() < deadline:
+            time.sleep(LEASE_POLL)
+            record = self.cache.get(key, memory=False) or {}
+            if valid(record) if valid else record.get('expires', 0) > time.time():
+                return record
+            if self.cache.acquire(key, LEASE_SECONDS):
+                return None
+        self._log(f"_awaitRecord, timed out waiting for {key}", 2)
+        return None
+
+    def _fetchRecord(self, url, key, record, hours, parse):
+        """
+        Download the url and cache it, see _openRecord.
+
+        :param      url:     The url
+        :type       url:     str
+        :param      key:     The cache key
+        :type       key:     str
+        :param      record:  the expired cache record, or empty
+        :type       record:  dict
+        :param      hours:   cache retention period in hours
+        :type       hours:   int
+        :param      parse:   function applied to the content before caching
+        :type       parse:   callable
+
+        :returns:   cache record and number of bytes downloaded
+        :rtype:     tuple
+        """
+        host = urlsplit(url).netloc
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('modified'):
+            headers['If-Modified-Since'] = record['modified']
+        import requests
+
+        try:
+            response = self._request(url, headers)
+        except Exception as e:
+            self._breakerUpdate(host, failed=True)
+            return self._staleRecord(url, record, e)
+        self._breakerUpdate(host, failed=False)
+        trace.count('net.bytes', len(response.content))
+        if response.status_code == requests.codes.not_modified and 'body' in record:
+            self._log('openURL, not modified')
+            trace.count('cache.revalidated')
+        elif response.status_code == requests.codes.ok:
+            response.encoding = 'utf-8'
+            with trace.span('parse'):
+                body = response.text if parse is None else parse(response.text)
+            record = {
+                'body': body,
+                'etag': response.headers.get('ETag'),
+                'modified': response.headers.get('Last-Modified'),
+                # changes only with the body, see cachedListing
+                'stamp': time.time(),
+            }
+        elif response.status_code in NEGATIVE_STATUS:
+            self.cache.set(key, {
+                'missing': response.status_code,
+                'expires': time.time() + NEGATIVE_MINUTES * 60,
+            }, expiration=datetime.timedelta(minutes=NEGATIVE_MINUTES), json_data=True)
+            response.raise_for_status()
+        else:
+            response.raise_for_status()
+
+        record['expires'] = time.time() + hours * 3600
+        keep = datetime.timedelta(hours=hours, days=REVALIDATE_DAYS)
+        self.cache.set(key, record, expiration=keep, json_data=True)
+        self.cache.set(
+            f"{addonutils.ID}_stamp[{key}]", [record.get('stamp'), record['expires']],
+            expiration=keep, json_data=True)
+        return record, len(response.content)
+
+    def _request(self, url, headers):
+        """
+        GET the url, retrying connection errors, timeouts and
+        RETRY_STATUS responses with a jittered exponential backoff.
+        Raises once the retries are exhausted.
+
+        :param      url:      The url
+        :type       url:      str
+        :param      headers:  request headers
+        :type       headers:  dict
+
+        :returns:   the response
+        :rtype:     requests.Response
+        """
+        import requests
+
+        for retry in range(RETRIES + 1):
+            if retry:
+                trace.count('net.retry')
+                time.sleep(random.uniform(0, BACKOFF * 2 ** retry))
+            try:
+                with trace.span('network'):
+                    response = getSession().get(url, headers=headers, timeout=TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._log(f"_request, {url} failed: {e}", 2)
+                if retry == RETRIES:
+                    raise
+                continue
+            if response.status_code not in RETRY_STATUS:
+                return response
+            self._log(f"_request, {url} failed: HTTP {response.status_code}", 2)
+        response.raise_for_status()
+
+    def _staleRecord(self, url, record, error):
+        """
+        Fallback of a failed download, the expired record if available.
+
+        :param      url:     The url
+        :type       url:     str
+        :param      record:  The expired record
+        :type       record:  dict
+        :param      error:   the error raised if no record is available
+        :type       error:   Exception
+
+        :returns:   cache record and number of bytes downloaded
+        :rtype:     tuple
+        """
+        if 'body' not in record:
+            raise error
+        self._log(f"openURL, serving stale {url}: {error}", 2)
+        trace.count('cache.stale')
+        return record, 0
+
+    def _breakerOpen(self, host):
+        """
+        Check if the circuit breaker of the host is open. Once
+        BREAKER_SECONDS have passed a request is let through,
+        if it fails the breaker opens again.
+
+        :param      host:  The host
+        :type       host:  str
+
+        :returns:   True if no request should be sent
+        :rtype:     bool
+        """
+        state = self.cache.get(f"{addonutils.ID}.breaker[{host}]", json_data=True)
+        return bool(state and state['opened'] + BREAKER_SECONDS > time.time())
+
+    def _breakerUpdate(self, host, failed):
+        """
+        Count the failures in a row of the host, opening its
+        circuit breaker after BREAKER_FAILURES.
+
+        :param      host:    The host
+        :type       host:    str
+        :param      failed:  the request failed
+        :type       failed:  bool
+        """
+        key = f"{addonutils.ID}.breaker[{host}]"
+        state = self.cache.get(key, json_data=True) or {'failures': 0, 'opened': 0}
+        if not failed:
+            if state['failures']:
+                self.cache.set(key, None, expiration=datetime.timedelta(seconds=0))
+            return
+        state['failures'] += 1
+        if state['failures'] >= BREAKER_FAILURES:
+            self._log(f"_breakerUpdate, circuit breaker open for {host}", 3)
+            trace.count('breaker.open')
+            state['opened'] = time.time()
+        self.cache.set(
+            key, state, expiration=datetime.timedelta(hours=1), json_data=True)
+
     def _createURL(self, url, fix=False):
         """
         Check if url is full or only partial
@@ -149,7 +573,7 @@ class CC(object):
     def _loadJsonData(self, url, hours=24):
         """
         Extract the JSON data from the provided url.
-        Checks if the url contain html or json
+        Only the parsed payload is cached, see _parsePage.
 
         :param      url:    The url with the data to extract
         :type       url:    str
@@ -160,64 +584,389 @@ class CC(object):
         :rtype:     json
         """
         self._log(f"_loadJsonData, url = {url}", 1)
-        response = self._openURL(url, hours=hours)
+        return self._openURL(url, hours=hours, parse=self._parsePage)
+
+    def _parsePage(self, response):
+        """
+        Checks if the response contain html or json and extract the data.
+        From html pages only the MainContainer elements are kept,
+        the rest of the page state is never used.
+        Raises ValueError if no data is found, it can run in
+        background threads so the error is reported by _openURL.
+
+        :param      response:  The page content
+        :type       response:  str
+
+        :returns:   Json data extarcted
+        :rtype:     json
+        """
         if len(response) == 0:
             return
 
         try:
             # check if the file is json
-            items = json.loads(response)
+            return json.loads(response)
         except:
-            # file is html
-            try:
-                src = re.search('__DATA__\\s*=\\s*(.+?);\\s*window\\.__PUSH_STATE__', response).group(1)
-                items = json.loads(src)
-            except Exception as e:
-                addonutils.notify(T('error.no.json'))
-                self._log(f"_loadJsonData, NO JSON DATA FOUND: {e}", 3)
-                addonutils.endScript()
+            pass
 
-        return items
+        # file is html
+        try:
+            items = extractData(response)
+        except Exception as e:
+            raise ValueError(f"NO JSON DATA FOUND: {e}")
 
-    def _extractItemType(self, data, type, ext):
+        return {
+            'children': [x for x in items.get('children') or []
+                         if x.get('type') == 'MainContainer'],
+        }
+
+    def _loadPage(self, url, hours=24):
         """
-        Search for element with the 'type' provided and return 'ext'
-        Eg. return the "children" element of an element with 'type' "MainContent"
+        Load the data of the provided url as a Page.
+        Pages are kept for the whole invocation so the same url
+        is parsed and indexed only once.
 
-        :param      data:  The data
-        :type       data:  json
-        :param      type:  'type' key to search
-        :type       type:  str
-        :param      ext:   'ext' key to extract
-        :type       ext:   str
+        :param      url:    The url with the data to extract
+        :type       url:    str
+        :param      hours:  cache retention duration
+        :type       hours:  int
 
-        :returns:   extracted data
-        :rtype:     json
+        :returns:   page
+        :rtype:     Page
+        """
+        if url not in self._pages:
+            self._pages[url] = Page(self._loadJsonData(url, hours=hours))
+        return self._pages[url]
+
+    def refreshPage(self, url, hours=24):
         """
-        self._log(f"_extractItemType, type = {type}; ext = {ext}", 1)
-        items = [x.get(ext) for x in data if x.get('type') == type]
-        return items[0] if len(items) > 0 and isinstance(items[0], list) else items
+        Revalidate the cached data of the url even if not expired,
+        used by the service to keep the pages warm.
+
+        :param      url:    The url
+        :type       url:    str
+        :param      hours:  cache retention duration
+        :type       hours:  int
 
-    def _extractItems(self, data):
+        :returns:   page and number of bytes downloaded
+        :rtype:     tuple
         """
-        extract items from the json data
+        self._log(f"refreshPage, url = {url}", 1)
+        record, size = self._openRecord(url, hours, self._parsePage, refresh=True)
+        return Page(record['body']), size
 
-        :param      data:  The data
-        :type       data:  json
+    def isFolder(self, url):
+        """
+        Check if the url is a page listed by genericList
 
-        :returns:   items extracted
+        :param      url:  The url
+        :type       url:  str
+
+        :returns:   True for parsable pages
+        :rtype:     bool
+        """
+        return any((f"/{x}/") in url for x in PAGES_CRUMB)
+
+    def folderURLs(self, page):
+        """
+        Urls of the parsable pages linked by the cards of the page
+
+        :param      page:  The page
+        :type       page:  Page
+
+        :returns:   urls
         :rtype:     list
         """
-        self._log('_extractItems')
-        items = []
-        for item in data or []:
-            if item.get('type') == 'LineList':
-                items.extend(item['props'].get('items') or [])
-                items.extend([item['props'].get('loadMore')] or [])
-            if item.get('type') == 'Fragment':
-                items.extend(self._extractItems(item.get('children')) or [])
-        self._log(f"_extractItems, items extracted = {len(items)}", 1)
-        return items
+        return [self._createURL(x['url']) for x in page.cards()
+                if x.get('url') and self.isFolder(x['url'])]
+
+    def _addVideoInfo(self, infos):
+        """
+        Collect the info of a playable item, saved with the others
+        by _flushVideoInfo.
+
+        :param      infos:  The item
+        :type       infos:  dict
+        """
+        self._videoInfo[f"{addonutils.ID}_videoInfo[{infos['params']['url']}]"] = [
+            infos['videoInfo'], infos['arts']]
+
+    def _flushVideoInfo(self):
+        """
+        Save the collected video info, in one transaction.
+        """
+        if self._videoInfo:
+            self.cache.setMany(self._videoInfo, expiration=datetime.timedelta(hours=2))
+            self._videoInfo = {}
+
+    def _usePage(self, key, record):
+        """
+        Note the version of a page record the listing is made of,
+        None if it couldn't be loaded, see cachedListing.
+
+        :param      key:     The cache key of the page
+        :type       key:     str
+        :param      record:  The record
+        :type       record:  dict
+        """
+        self._stamps[key] = record.get('stamp') if record else None
+
+    def cachedListing(self, params, items):
+        """
+        The items of a directory: the ones cached for its mode, url
+        and name if none of the pages they were made of changed or
+        expired, otherwise the ones generated by items, cached once
+        all generated.
+        The background work of the listing, prefetching the next pages,
+        loading the seasons and resolving the first videos, is done as
+        it was generated
+        and the video info saved again. The catalog and the mgids
+        already have its items. Settings changing the items are part
+        of the key, see LISTING_SETTINGS.
+
+        :param      params:  The directory params
+        :type       params:  dict
+        :param      items:   The generator of the items
+        :type       items:   generator
+
+        :returns:   items
+        :rtype:     generator
+        """
+        if params.get('mode') not in LISTING_MODES:
+            yield from items
+            return
+        settings = ','.join(f"{x}={getattr(self.settings, x)}" for x in LISTING_SETTINGS)
+        key = (f"{addonutils.ID}_listing[{params['mode']}|{params.get('url')}"
+               f"|{params.get('name')}|{settings}]")
+        listing = self.cache.get(key, json_data=True)
+        if listing and self._validListing(listing):
+            trace.count('listing.hit')
+            self._log(f"cachedListing, {len(listing['items'])} cached items", 1)
+            for infos in listing['items']:
+                if infos.get('playable'):
+                    self._addVideoInfo(infos)
+            # the cached ones may be more than the current setting
+            self._speculative = [
+                tuple(x) for x in listing['speculative']
+            ][:max(0, self.settings.SpeculativeCount)]
+            if self.settings.Prefetch > 0:
+                for urls, mode in listing['prefetched']:
+                    self._prefetchURLs(urls, mode, self.settings.Prefetch)
+            for urls in listing.get('seasons') or []:
+                self._warmSeasons(urls)
+            yield from listing['items']
+            return
+
+        trace.count('listing.miss')
+        self._stamps = {}
+        generated = []
+        for infos in items:
+            generated.append(infos)
+            yield infos
+        if not self._stamps:
+            return
+        self.cache.set(key, {
+            'pages': self._stamps,
+            'items': generated,
+            'speculative': self._speculative,
+            'prefetched': self._prefetched,
+            'seasons': self._seasons,
+        }, expiration=datetime.timedelta(days=REVALIDATE_DAYS), json_data=True)
+
+    def _validListing(self, listing):
+        """
+        Check the pages of a cached listing are the same and not expired
+
+        :param      listing:  The listing
+        :type       listing:  dict
+
+        :returns:   True if valid
+        :rtype:     bool
+        """
+        now = time.time()
+        for key, stamp in listing['pages'].items():
+            current = self.cache.get(f"{addonutils.ID}_stamp[{key}]", json_data=True)
+            if stamp is None or not current or current[0] != stamp or current[1] <= now:
+                return False
+        return True
+
+    def _addMgid(self, url, mgid):
+        """
+        Collect the mgid of a video url, saved by _flushMgids, so
+        that playing the url doesn't need to download its page.
+
+        :param      url:   The url
+        :type       url:   str
+        :param      mgid:  The mgid or id
+        :type       mgid:  str
+        """
+        if url and mgid:
+            self._mgids[f"{addonutils.ID}_mgid[{self._createURL(url, fix=True)}]"] = (
+                self._getMgid(mgid))
+
+    def _flushMgids(self):
+        """
+        Save the collected mgids not already saved, in one transaction.
+        """
+        if self._mgids:
+            self.cache.setMany(
+                self._mgids, expiration=datetime.timedelta(days=MGID_DAYS), replace=False)
+            self._mgids = {}
+
+    def _findMgid(self, url, mgid=None):
+        """
+        The full mgid of a video: the provided one, or the one
+        found for its url in a listing or a previous extraction.
+
+        :param      url:   The url
+        :type       url:   str
+        :param      mgid:  The mgid or id
+        :type       mgid:  str
+
+        :returns:   full mgid or None
+        :rtype:     str
+        """
+        if mgid:
+            return self._getMgid(mgid)
+        key = f"{addonutils.ID}_mgid[{self._createURL(url, fix=True)}]"
+        mgid = self._mgids.get(key) or self.cache.get(key)
+        if mgid:
+            trace.count('mgid.found')
+        return mgid
+
+    def _openCatalog(self):
+        """
+        Open the catalog database in the addon profile
+
+        :returns:   the catalog
+        :rtype:     Catalog
+        """
+        from resources.lib.catalog import Catalog
+
+        os.makedirs(addonutils.DATA_PATH_T, exist_ok=True)
+        return Catalog(os.path.join(addonutils.DATA_PATH_T, CATALOG_FILE))
+
+    def _addCatalog(self, infos):
+        """
+        Collect a listed item to be saved in the catalog by _flushCatalog
+
+        :param      infos:  The item
+        :type       infos:  dict
+        """
+        self._catalog.append(infos)
+
+    def _flushCatalog(self):
+        """
+        Save the collected items in the catalog.
+        """
+        if not self._catalog:
+            return
+        catalog = self._openCatalog()
+        try:
+            written = catalog.add(self._catalog)
+            self._log(f"_flushCatalog, items = {len(self._catalog)}, written = {written}")
+        except Exception as e:
+            self._log(f"_flushCatalog, failed: {e}", 3)
+        finally:
+            catalog.close()
+        self._catalog = []
+
+    def _prefetch(self, page, mode, quote=False, depth=None):
+        """
+        Download in background the 'load more' pages of the provided page
+        and the following ones, up to depth pages ahead.
+
+        :param      page:   The page
+        :type       page:   Page
+        :param      mode:   mode that will render the next page
+        :type       mode:   str
+        :param      quote:  urlencode ":" in the next page url
+        :type       quote:  bool
+        :param      depth:  number of pages to prefetch
+        :type       depth:  int
+        """
+        listed = depth is None
+        if depth is None:
+            depth = self.settings.Prefetch
+        if depth <= 0 or not page.loadMore():
+            return
+        urls = [
+            self._createURL(x['url'].replace(':', '%3A') if quote else x['url'])
+            for x in page.loadMore()]
+        if listed:
+            # replayed when the listing is served by cachedListing
+            self._prefetched.append([urls, mode])
+        self._prefetchURLs(urls, mode, depth)
+
+    def _prefetchURLs(self, urls, mode, depth):
+        """
+        Submit the pages to the prefetcher, see _prefetch.
+
+        :param      urls:   The urls
+        :type       urls:   list
+        :param      mode:   mode that will render the pages
+        :type       mode:   str
+        :param      depth:  number of pages to prefetch
+        :type       depth:  int
+        """
+        if self._prefetcher is None:
+            self._prefetcher = TaskQueue(
+                maxsize=PREFETCH_QUEUE, budget=PREFETCH_BUDGET)
+        for url in urls:
+            self._prefetcher.submit(self._prefetchPage, url, mode, depth)
+
+    def _prefetchPage(self, url, mode, depth):
+        """
+        Prefetcher task, loads the page in the cache.
+
+        :returns:   number of bytes downloaded
+        :rtype:     int
+        """
+        if self._prefetcher.cancelled:
+            return 0
+        self._log(f"_prefetchPage, url = {url}", 1)
+        try:
+            record, size = self._openRecord(
+                url, 1 if mode == 'EPISODES' else 24, self._parsePage)
+        except Exception as e:
+            self._log(f"_prefetchPage, failed: {e}", 2)
+            return 0
+        # next pages are rendered by loadItems, which quotes the url
+        self._prefetch(Page(record['body']), mode, mode == 'EPISODES', depth - 1)
+        return size
+
+    def _speculate(self):
+        """
+        Resolve in background the media of the first episodes listed
+        by loadItems, so they play straight from the cache.
+        Stops as soon as the user leaves the directory or starts a video.
+        """
+        time.sleep(SPECULATIVE_DELAY)
+        folder = addonutils.getInfoLabel('Container.FolderPath')
+        resolver = TaskQueue(
+            workers=max(1, self.settings.SpeculativeWorkers), maxsize=len(self._speculative))
+        for url, mgid in self._speculative:
+            resolver.submit(self._speculateMedia, url, mgid, folder, resolver)
+        resolver.close(SPECULATIVE_GRACE)
+
+    def _speculateMedia(self, url, mgid, folder, resolver):
+        """
+        Speculative resolver task.
+
+        :returns:   number of bytes used
+        :rtype:     int
+        """
+        if resolver.cancelled or addonutils.isPlaying() or (
+                addonutils.getInfoLabel('Container.FolderPath') != folder):
+            self._log('_speculateMedia, user moved on')
+            resolver.cancel()
+            return 0
+        mgid = self._getMgid(mgid)
+        if not playback.isValid(self.cache.get(
+                f"{addonutils.ID}_playback[{mgid or url}]", json_data=True)):
+            self._log(f"_speculateMedia, url = {url}, mgid = {mgid}", 1)
+            self._extractInfo(url, mgid)
+        return 0
 
     def _getDuration(self, duration):
         """
@@ -254,7 +1003,13 @@ class CC(object):
         :rtype:     json
         """
         self._log('getMainMenu', 1)
-        return MAIN_MENU
+        menu = []
+        for item in MAIN_MENU:
+            params = dict(item['params'])
+            if 'name' in params:
+                params['name'] = T(params['name'])
+            menu.append({'label': T(item['label']), 'params': params})
+        return menu
 
     def showsList(self, url):
         """
@@ -267,20 +1022,9 @@ class CC(object):
         :rtype:     dict
         """
         self._log(f"showsList, url = {url}", 1)
-        items = self._loadJsonData(url)
-        if 'items' in items:
-            items['items'].extend([items.get('loadMore')] or [])
-            items = items['items']
-        else:
-            items = self._extractItemType(
-                items.get('children') or [],
-                'MainContainer',
-                'children')
-            items = self._extractItems(items)
-
-        for item in items:
-            if not item:
-                continue
+        page = self._loadPage(url)
+        self._prefetch(page, 'SHOWS')
+        for item in page.items():
             if 'loadingTitle' in item:
                 # NEXT PAGE
                 yield {
@@ -292,7 +1036,7 @@ class CC(object):
                 }
             else:
                 label = item['meta']['header']['title']
-                yield {
+                infos = {
                     'label': label,
                     'params': {
                         'mode': 'GENERIC',
@@ -306,6 +1050,8 @@ class CC(object):
                     },
                     'arts': self._createInfoArt(item['media']['image']['url'], False),
                 }
+                self._addCatalog(infos)
+                yield infos
 
     def genericList(self, name, url):
         """
@@ -334,27 +1080,78 @@ class CC(object):
             self._log(f"error: {e}", 3)
             addonutils.endScript()
 
+    def _seasonItems(self, page):
+        """
+        Items of the video guide of a season page.
+
+        :param      page:  The season page
+        :type       page:  Page
+
+        :returns:   items
+        :rtype:     list
+        """
+        filters = page.first('video-guide')['filters']
+        if isinstance(filters, list):
+            filters = filters[0]
+        return filters.get('items')
+
+    def _warmSeasons(self, urls):
+        """
+        Download in background the season pages of a show, and the
+        episodes page of the seasons made of a single list, so that
+        opening a season is served from the cache.
+
+        :param      urls:  The season urls
+        :type       urls:  list
+        """
+        if self._seasonLoader is None:
+            self._seasonLoader = TaskQueue(workers=SEASON_WORKERS, maxsize=len(urls))
+        for url in urls:
+            self._seasonLoader.submit(self._warmSeason, url)
+
+    def _warmSeason(self, url):
+        """
+        Season loader task, loads the pages in the cache.
+
+        :returns:   number of bytes downloaded
+        :rtype:     int
+        """
+        if self._seasonLoader.cancelled:
+            return 0
+        self._log(f"_warmSeason, url = {url}", 1)
+        try:
+            record, size = self._openRecord(url, 24, self._parsePage)
+            guide = self._seasonItems(Page(record['body']))
+            if len(guide) == 1:
+                # the SEASON directory lists it directly, see loadShows
+                size += self._openRecord(
+                    self._createURL(guide[0].get('url') or url), 1, self._parsePage)[1]
+        except Exception as e:
+            self._log(f"_warmSeason, failed: {e}", 2)
+            return 0
+        return size
+
     def loadShows(self, name, url, season=False):
         self._log(f"loadShows, name = {name}, url = {url}, season = {season}", 1)
-        items = self._loadJsonData(url)
+        page = self._loadPage(url)
         if not season:
-            items = self._extractItemType(
-                items.get('children') or [], 'MainContainer', 'children')
-            items = self._extractItemType(items, 'SeasonSelector', 'props')
+            selector = page.first('SeasonSelector')
+            items = selector['props']['items'] if selector else []
             # check if no season selector is present
             # or season selector is empty
             if len(items) == 0 or (
-                    len(items[0]['items']) == 1 and not items[0]['items'][0].get('url')):
+                    len(items) == 1 and not items[0].get('url')):
                 # and load directly the show
                 yield from self.loadShows(name, url, True)
                 return
+            if self.settings.ParallelSeasons and len(items) > 1:
+                seasons = [self._createURL(x.get('url') or url) for x in items]
+                # replayed when the listing is served by cachedListing
+                self._seasons.append(seasons)
+                self._warmSeasons(seasons)
         else:
-            items = self._extractItemType(
-                items.get('children') or [], 'MainContainer', 'children')
-            items = self._extractItemType(items, 'LineList', 'props')
-            items = self._extractItemType(items, 'video-guide', 'filters')
+            items = self._seasonItems(page)
 
-        items = items[0].get('items')
         # check if there is only one item
         if len(items) == 1:
             # and load it directly
@@ -393,29 +1190,10 @@ class CC(object):
         :type       url:   str
         """
         self._log(f"loadTopic, name = {name}, url = {url}")
-        items = self._loadJsonData(url)
-        items = self._extractItemType(
-            items.get('children') or [],
-            'MainContainer',
-            'children')
-        for item in self._extractItems(items) or []:
-            if not item:
-                continue
-            if 'loadingTitle' in item:
-                yield {
-                    'label': T('load.more'),
-                    'params': {
-                        'mode': 'EPISODES',
-                        'url': self._createURL(item['url']),
-                        'name': name,
-                    },
-                    'arts': self._createInfoArt(),
-                }
-
-            # skip non necessary elements, like ADS and others
-            if item.get('cardType') not in ['series', 'episode', 'promo']:
-                continue
-
+        page = self._loadPage(url)
+        self._prefetch(page, 'EPISODES')
+        # skip non necessary elements, like ADS and others
+        for item in page.cards('series', 'episode', 'promo'):
             # skip 'promo' items in Digital Original listing
             # as they are duplicates of something already in the list
             if name == T('digital.original') and item.get('cardType') == 'promo':
@@ -426,7 +1204,7 @@ class CC(object):
 
             label = item['title']
             # playable is determined by the url not being in the parsable pages
-            playable = not any((f"/{x}/") in item['url'] for x in PAGES_CRUMB)
+            playable = not self.isFolder(item['url'])
             media = item.get('media') or {}
             image = media.get('image') or {}
             infos = {
@@ -447,13 +1225,22 @@ class CC(object):
             }
 
             if playable:
-                self.cache.set(
-                    f"{addonutils.ID}_videoInfo[{infos['params']['url']}]",
-                    [infos['videoInfo'], infos['arts']],
-                    expiration=datetime.timedelta(hours=2),
-                    json_data=True)
+                self._addVideoInfo(infos)
+                self._addMgid(infos['params']['url'], item.get('mgid'))
+            self._addCatalog(infos)
             yield infos
 
+        for item in page.loadMore():
+            yield {
+                'label': T('load.more'),
+                'params': {
+                    'mode': 'EPISODES',
+                    'url': self._createURL(item['url']),
+                    'name': name,
+                },
+                'arts': self._createInfoArt(),
+            }
+
     def loadItems(self, name, url):
         """
         Generate a list of playable items from the provided url
@@ -467,8 +1254,60 @@ class CC(object):
         :rtype:     list
         """
         self._log(f"loadItems, name = {name}, url = {url}")
-        items = self._loadJsonData(url, hours=1)
-        for item in items.get('items') or []:
+        page = self._loadPage(url, hours=1)
+        self._prefetch(page, 'EPISODES', quote=True)
+        if name and page.loadMore():
+            yield {
+                'label': T('all.episodes'),
+                'params': {
+                    'mode': 'EPISODES_ALL',
+                    'url': url,
+                    'name': name,
+                },
+                'arts': self._createInfoArt(),
+            }
+        yield from self._episodeItems(name, url, page)
+        yield from self._loadMoreItems(name, page)
+
+    def _loadMoreItems(self, name, page):
+        """
+        Generate the 'load more' items of an episodes page
+
+        :param      name:  The name
+        :type       name:  str
+        :param      page:  The page
+        :type       page:  Page
+
+        :returns:   items
+        :rtype:     list
+        """
+        for item in page.loadMore():
+            yield {
+                'label': T('load.more'),
+                'params': {
+                    'mode': 'EPISODES',
+                    # replace necessary to urlencode only ":"
+                    'url': self._createURL(item['url'].replace(':', '%3A')),
+                    'name': name,
+                },
+                'arts': self._createInfoArt(),
+            }
+
+    def _episodeItems(self, name, url, page):
+        """
+        Generate the playable items of an episodes page
+
+        :param      name:  The name
+        :type       name:  str
+        :param      url:   The url of the page
+        :type       url:   str
+        :param      page:  The page
+        :type       page:  Page
+
+        :returns:   items
+        :rtype:     list
+        """
+        for item in page.cards():
             if item.get('cardType') == 'ad':
                 continue
             meta = item.get('meta')
@@ -513,28 +1352,249 @@ class CC(object):
                 'arts': self._createInfoArt(image.get('url')),
                 'playable': True,
             }
-            self.cache.set(
-                f"{addonutils.ID}_videoInfo[{infos['params']['url']}]",
-                [infos['videoInfo'], infos['arts']],
-                expiration=datetime.timedelta(hours=2),
-                json_data=True)
+            self._addVideoInfo(infos)
+            self._addCatalog(infos)
+            self._addMgid(infos['params']['url'], infos['params']['mgid'])
+            if len(self._speculative) < self.settings.SpeculativeCount:
+                self._speculative.append(
+                    (infos['params']['url'], infos['params']['mgid']))
             yield infos
 
-        if items.get('loadMore'):
-            yield {
-                'label': T('load.more'),
-                'params': {
-                    'mode': 'EPISODES',
-                    # replace necessary to urlencode only ":"
-                    'url': self._createURL(items['loadMore']['url'].replace(':', '%3A')),
-                    'name': name,
-                },
-                'arts': self._createInfoArt(),
-            }
+    def loadAllItems(self, name, url):
+        """
+        Generate the playable items of all the pages following the
+        provided url. Pages are downloaded in parallel, up to
+        ALL_MAX_PAGES, and their items yielded in order as they arrive,
+        skipping duplicates. The pages requested past the last one
+        are not waited for. If the 'load more' url has no page number
+        only the first page is listed, with its 'load more' items.
+
+        :param      name:  The name
+        :type       name:  str
+        :param      url:   The url of the first page
+        :type       url:   str
+
+        :returns:   items
+        :rtype:     list
+        """
+        self._log(f"loadAllItems, name = {name}, url = {url}")
+        page = self._loadPage(url, hours=1)
+        seen = set()
+        for infos in self._episodeItems(name, url, page):
+            seen.add(infos['params']['mgid'] or infos['params']['url'])
+            yield infos
+        more = page.loadMore()
+        match = more and PAGINATION.match(more[0]['url'])
+        if not match:
+            yield from self._loadMoreItems(name, page)
+            return
+        prefix, first, size = match.groups()
+
+        def pageURL(number):
+            return self._createURL(f"{prefix}{number}/{size}".replace(':', '%3A'))
+
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+
+        number = int(first)
+        last = number + ALL_MAX_PAGES - 1
+        executor = self._pageLoader = ThreadPoolExecutor(max_workers=ALL_WORKERS)
+        pending = deque()
+        try:
+            while True:
+                # keep ALL_WORKERS pages downloading ahead of the one listed
+                while len(pending) < ALL_WORKERS and number <= last:
+                    pending.append((number, executor.submit(
+                        self._openRecord, pageURL(number), 1, self._parsePage)))
+                    number += 1
+                if not pending:
+                    break
+                current, future = pending.popleft()
+                key = self._recordKey(pageURL(current), self._parsePage)
+                try:
+                    record = future.result()[0]
+                    page = Page(record['body'])
+                except Exception as e:
+                    self._log(f"loadAllItems, page {current} failed: {e}", 2)
+                    self._usePage(key, None)
+                    break
+                self._usePage(key, record)
+                for infos in self._episodeItems(name, url, page):
+                    dedup = infos['params']['mgid'] or infos['params']['url']
+                    if dedup not in seen:
+                        seen.add(dedup)
+                        yield infos
+                if not page.cards() or not page.loadMore():
+                    break
+                if current == last:
+                    # too many pages, continue one page at a time
+                    yield {
+                        'label': T('load.more'),
+                        'params': {
+                            'mode': 'EPISODES',
+                            'url': pageURL(current + 1),
+                            'name': name,
+                        },
+                        'arts': self._createInfoArt(),
+                    }
+        finally:
+            # the pages past the last one complete in background, see close
+            for current, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def search(self, text=None):
+        """
+        Search the catalog, the text is asked if not provided.
+
+        :param      text:  The text to search
+        :type       text:  str
+
+        :returns:   items
+        :rtype:     list
+        """
+        text = text or addonutils.getKeyboardInput(T('search'))
+        self._log(f"search, text = {text}")
+        if not text:
+            return
+        yield from self._catalogItems(lambda x: x.search(text, CATALOG_LIMIT))
+
+    def loadRecent(self):
+        """
+        The most recently aired episodes in the catalog
+
+        :returns:   items
+        :rtype:     list
+        """
+        self._log('loadRecent')
+        yield from self._catalogItems(lambda x: x.recent(CATALOG_LIMIT))
+
+    def _catalogItems(self, query):
+        """
+        Items returned by a catalog query, no network is used.
+
+        :param      query:  function querying the catalog
+        :type       query:  callable
+
+        :returns:   items
+        :rtype:     list
+        """
+        catalog = self._openCatalog()
+        try:
+            with trace.span('catalog'):
+                items = list(query(catalog))
+        except Exception as e:
+            self._log(f"_catalogItems, failed: {e}", 3)
+            items = []
+        finally:
+            catalog.close()
+        for infos in items:
+            if infos['playable']:
+                self._addVideoInfo(infos)
+            yield infos
+
+    def _getMgid(self, mgid):
+        """
+        Complete the mgid if only the id is provided
+
+        :param      mgid:  The mgid or id
+        :type       mgid:  str
+
+        :returns:   full mgid
+        :rtype:     str
+        """
+        if mgid and not mgid.startswith('mgid'):
+            return f"{BASE_MGID}{mgid}"
+        return mgid
+
+    def _extractInfo(self, url, mgid=None, items=None):
+        """
+        Resolve with yt-dlp the media of the provided url or mgid
+        and cache its playback record. Only the acts in items are
+        resolved if provided, and the partial record is not cached.
+        The whole playlist is resolved holding the lease of the record,
+        and not resolved if another thread or invocation holds it,
+        see getMediaUrl. If the ComedyCentral extractor alone fails,
+        it's resolved again with the default extractors.
+
+        :param      url:    The url
+        :type       url:    str
+        :param      mgid:   The full mgid
+        :type       mgid:   str
+        :param      items:  yt-dlp playlist_items, like 1 or 2-5
+        :type       items:  str
+
+        :returns:   playback record or None
+        :rtype:     dict
+        """
+        key = f"{addonutils.ID}_playback[{mgid or url}]"
+        if not items and not self.cache.acquire(key, LEASE_SECONDS):
+            self._log(f"_extractInfo, {mgid or url} resolved elsewhere", 1)
+            return None
+        try:
+            with trace.span('extract'):
+                try:
+                    ytInfo = self.resolver.extractInfo(mgid or url, items)
+                except Exception as e:
+                    self._log(f"_extractInfo, retrying with the default extractors: {e}", 2)
+                    trace.count('resolver.fallback')
+                    ytInfo = self.resolver.extractInfo(mgid or url, items, defaults=True)
+                record = playback.createRecord(ytInfo)
+        except:
+            return None
+        finally:
+            if not items:
+                self.cache.release(key)
+        if not mgid and str(ytInfo.get('id')).startswith('mgid:'):
+            self._addMgid(url, ytInfo['id'])
+            self._flushMgids()
+        self._log(f"_extractInfo, items = {items}, record size = {playback.recordSize(record)}")
+        if not items:
+            self._setPlayback(mgid or url, record)
+        return record
+
+    def _setPlayback(self, id, record):
+        self.cache.set(
+            f"{addonutils.ID}_playback[{id}]", record,
+            expiration=datetime.timedelta(hours=2),
+            json_data=True)
+
+    def _playbackActs(self, record, rest, id):
+        """
+        The acts of record, followed by the ones resolved by rest
+        once done. The merged record is cached.
+
+        :param      record:  The record
+        :type       record:  dict
+        :param      rest:    resolving the remaining acts, or None
+        :type       rest:    concurrent.futures.Future
+        :param      id:      mgid or url of the video
+        :type       id:      str
+
+        :returns:   acts
+        :rtype:     generator
+        """
+        yield from record['acts']
+        if rest is None:
+            return
+        with trace.span('extract.rest'):
+            other = rest.result()
+        if other is None:
+            self._log('getMediaUrl, remaining acts not resolved', 2)
+            return
+        merged = playback.mergeRecords(record, other)
+        self._setPlayback(id, merged)
+        resolved = set(x['idx'] for x in record['acts'])
+        yield from (x for x in merged['acts'] if x['idx'] not in resolved)
 
     def getMediaUrl(self, name, url, mgid=None, select_quality=False):
         """
-        Retrive media urls with yt-dlp for the provided url or mgid
+        Retrive media urls with yt-dlp for the provided url or mgid.
+        If not cached, the first act is resolved and yielded before
+        the others, resolved in a background thread meanwhile.
+        The lease of the record is held until it's cached, if another
+        invocation holds it, like a speculative resolve, its record
+        is waited for.
 
         :param      name:      Title
         :type       name:      str
@@ -544,71 +1604,174 @@ class CC(object):
         :type       mgid:      str
 
         :returns:   playable urls
-        :rtype:     list
+        :rtype:     generator
         """
-        from resources.lib import yt_dlp
-
         self._log(f"getMediaUrl, url = {url}, mgid = {mgid}")
-        self._log(f"yt-dlp version: {yt_dlp.version.__version__}")
-        if mgid and not mgid.startswith('mgid'):
-            mgid = f"{BASE_MGID}{mgid}"
+        mgid = self._findMgid(url, mgid)
+
+        key = f"{addonutils.ID}_playback[{mgid or url}]"
+        record = self.cache.get(key, json_data=True)
+        if not playback.isValid(record) and not self.cache.acquire(key, LEASE_SECONDS):
+            trace.count('playback.coalesced')
+            with trace.span('lease'):
+                record = self._awaitRecord(key, playback.isValid)
+        try:
+            yield from self._playItems(name, url, mgid, select_quality, record)
+        finally:
+            self.cache.release(key)
+
+    def _playItems(self, name, url, mgid, select_quality, record):
+        """
+        The items of getMediaUrl
+
+        :param      name:            Title
+        :type       name:            str
+        :param      url:             The url
+        :type       url:             str
+        :param      mgid:            The full mgid
+        :type       mgid:            str
+        :param      select_quality:  use the preferred quality
+        :type       select_quality:  bool
+        :param      record:          The cached playback record
+        :type       record:          dict
 
-        ytInfo = self.cache.get(
-            f"{addonutils.ID}_ytInfo[{mgid or url}]")
+        :returns:   playable urls
+        :rtype:     generator
+        """
         videoInfo = self.cache.get(
             f"{addonutils.ID}_videoInfo[{url}]", json_data=True
             ) or [{},{}]
 
-        if not ytInfo:
-            try:
-                ytInfo = yt_dlp.YoutubeDL().extract_info(mgid or url)
-                self.cache.set(
-                    f"{addonutils.ID}_ytInfo[{mgid or url}]", ytInfo,
-                    expiration=datetime.timedelta(hours=2))
-            except:
-                ytInfo = None
+        rest = None
+        if not playback.isValid(record):
+            trace.count('playback.miss')
+            record = self._extractInfo(url, mgid, '1')
+            # the mgid is known now, if in the result
+            mgid = mgid or self._findMgid(url)
+            if record and len(record['acts']) == 1 and record['count'] != 1:
+                from concurrent.futures import ThreadPoolExecutor
+
+                trace.count('playback.progressive')
+                executor = ThreadPoolExecutor(max_workers=1)
+                rest = executor.submit(self._extractInfo, url, mgid, f"2-{MAX_ACTS}")
+                executor.shutdown(wait=False)
+            elif record:
+                # yt-dlp resolved the whole playlist anyway
+                self._setPlayback(mgid or url, record)
+        else:
+            trace.count('playback.hit')
 
-        if ytInfo is None:
+        if record is None:
             addonutils.notify(T('error.no.video'))
             self._log('getMediaUrl, ydl.extract_info=None', 3)
             addonutils.endScript(exit=False)
-        if ytInfo.get('_type') != 'playlist':
+        if record['type'] != 'playlist':
             addonutils.notify(T('error.wrong.type'))
-            self._log(f"getPlayItems, info type <{ytInfo['_type']}> not supported", 3)
+            self._log(f"getPlayItems, info type <{record['type']}> not supported", 3)
             addonutils.endScript(exit=False)
 
-        for video in ytInfo.get('entries') or []:
-            vidIDX = video.get('playlist_index') or video.get('playlist_autonumber')
-            label = f"{name} - Act {vidIDX}" if video.get('n_entries') > 1 else name
-            subs = None
-            try:
-                if 'subtitles' in video:
-                    subs = [x['url'] for x in video['subtitles'].get('en', '')
-                            if 'url' in x and x['ext'] == 'vtt']
-            except:
-                pass
-
+        adaptive = select_quality and self.settings.AdaptiveQuality
+        bandwidth = self.cache.get(f"{addonutils.ID}.bandwidth") if adaptive else None
+        for act in self._playbackActs(record, rest, mgid or url):
+            label = f"{name} - Act {act['idx'] + 1}" if act['count'] > 1 else name
             videoInfo[0].update({
                 'title': label,
-                'duration': video.get('duration'),
+                'duration': act['duration'],
             })
-            if video.get('thumbnail'):
-                videoInfo[1].update(self._createInfoArt(video['thumbnail']))
+            if act['thumbnail']:
+                videoInfo[1].update(self._createInfoArt(act['thumbnail']))
 
             infos = {
-                'idx': vidIDX-1,
-                'url': video.get('url'),
+                'idx': act['idx'],
+                'url': act['manifest'],
                 'label': label,
                 'videoInfo': videoInfo[0],
                 'arts': videoInfo[1],
-                'subs': subs,
+                'subs': act['subs'],
             }
 
             if select_quality:
-                max_height = QUALITIES[QUALITY]
-                for i in range(len(video.get('formats'))-1, 0, -1):
-                    if video['formats'][i].get('height') <= max_height:
-                        self._log(f"getPlaylistContent, quality_found = {video['formats'][i].get('format_id')}")
-                        infos['url'] = video['formats'][i].get('url')
-                        break
+                selected = playback.selectRung(
+                    act, QUALITIES[self.settings.Quality], bandwidth)
+                if selected:
+                    self._log(f"getPlaylistContent, quality_found = {selected}")
+                    infos['url'] = selected
             yield infos
+            if adaptive and self._prober is None:
+                # measured once the first act is playing, for the next plays
+                self._prober = TaskQueue(maxsize=1)
+                self._prober.submit(self._measureBandwidth, act)
+
+    def _measureBandwidth(self, act):
+        """
+        Bandwidth prober task, saves the bandwidth measured
+        downloading the act for the next plays.
+
+        :returns:   number of bytes used
+        :rtype:     int
+        """
+        with trace.span('bandwidth'):
+            bandwidth = playback.measureBandwidth(getSession(), act)
+        self._log(f"_measureBandwidth, bandwidth = {bandwidth or 0:.0f} bit/s")
+        if bandwidth:
+            self.cache.set(
+                f"{addonutils.ID}.bandwidth", bandwidth,
+                expiration=datetime.timedelta(hours=BANDWIDTH_HOURS))
+        return 0
+
+    def stitchItems(self, name, items, port, url, mgid=None, select_quality=False):
+        """
+        Replace the acts yielded by getMediaUrl with a single item
+        playing them as one stream through the HLS proxy of the service.
+        The stream needs every act, so the video starts once all of them
+        are resolved instead of with the first one.
+
+        :param      name:            Title
+        :type       name:            str
+        :param      items:           items yielded by getMediaUrl
+        :type       items:           iterable
+        :param      port:            port of the proxy
+        :type       port:            int
+        :param      url:             The url
+        :type       url:             str
+        :param      mgid:            The mgid
+        :type       mgid:            str
+        :param      select_quality:  use the preferred quality instead of the master playlist
+        :type       select_quality:  bool
+
+        :returns:   playable items
+        :rtype:     list
+        """
+        from resources.lib import hlsproxy
+
+        # getMediaUrl updates the same videoInfo for every act
+        items = [dict(x, videoInfo=dict(x['videoInfo'])) for x in items]
+        if len(items) < 2:
+            return items
+        id = self._findMgid(url, mgid) or url
+        if select_quality:
+            stream = hlsproxy.mediaURL(port, id, QUALITIES[self.settings.Quality])
+        else:
+            stream = hlsproxy.masterURL(port, id)
+        self._log(f"stitchItems, acts = {len(items)}, url = {stream}")
+        videoInfo = dict(items[0]['videoInfo'], title=name, duration=sum(
+            x['videoInfo'].get('duration') or 0 for x in items))
+        return [{
+            'idx': 0,
+            'url': stream,
+            'label': name,
+            'videoInfo': videoInfo,
+            'arts': items[0]['arts'],
+        }]
+
+    def playbackRecord(self, id):
+        """
+        The cached playback record, used by the HLS proxy
+
+        :param      id:  mgid or url of the video
+        :type       id:  str
+
+        :returns:   playback record or None
+        :rtype:     dict
+        """
+        return self.cache.get(f"{addonutils.ID}_playback[{id}]", json_data=True)
@@ -0,0 +1,325 @@
+import hashlib
+import os
+import re
+import threading
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from urllib.parse import quote
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+from resources.lib import playback
+
+TIMEOUT = 15
+# media playlist tags replaced by the ones of the stitched playlist
+HEADER_TAGS = (
+    '#EXTM3U', '#EXT-X-VERSION', '#EXT-X-TARGETDURATION', '#EXT-X-MEDIA-SEQUENCE',
+    '#EXT-X-PLAYLIST-TYPE', '#EXT-X-ENDLIST', '#EXT-X-DISCONTINUITY-SEQUENCE',
+    '#EXT-X-INDEPENDENT-SEGMENTS')
+URI_ATTRIBUTE = re.compile(r'URI="([^"]+)"')
+RESOLUTION_ATTRIBUTE = re.compile(r'RESOLUTION=\d+x(\d+)')
+BANDWIDTH_ATTRIBUTE = re.compile(r'(?<![-\w])BANDWIDTH=(\d+)')
+# segments of the next act downloaded when one of the last
+# PREFETCH_TRIGGER segments of an act is requested
+PREFETCH_TRIGGER = 2
+PREFETCH_SEGMENTS = 2
+# stitched playlists and prefetched segments kept in memory
+MAX_PLAYLISTS = 8
+MAX_SEGMENTS = 8
+CHUNK_SIZE = 64 * 1024
+
+
+def masterURL(port, id):
+    """
+    Url of the master playlist of a playback record
+
+    :param      port:  port of the proxy
+    :type       port:  int
+    :param      id:    key of the playback record
+    :type       id:    str
+
+    :returns:   url
+    :rtype:     str
+    """
+    return f"http://127.0.0.1:{port}/master.m3u8?id={quote(id, safe='')}"
+
+
+def mediaURL(port, id, height):
+    """
+    Url of the stitched media playlist of a playback record
+
+    :param      port:    port of the proxy
+    :type       port:    int
+    :param      id:      key of the playback record
+    :type       id:      str
+    :param      height:  max height of the video
+    :type       height:  int
+
+    :returns:   url
+    :rtype:     str
+    """
+    return f"http://127.0.0.1:{port}/media.m3u8?id={quote(id, safe='')}&h={height}"
+
+
+def variantLadder(url, text):
+    """
+    Quality ladder of a master playlist, as the ones of
+    the playback records.
+
+    :param      url:   url of the master playlist
+    :type       url:   str
+    :param      text:  The master playlist
+    :type       text:  str
+
+    :returns:   [[height, kbps, url], ...] sorted by height and bitrate
+    :rtype:     list
+    """
+    ladder = []
+    lines = [x.strip() for x in text.splitlines() if x.strip()]
+    for line, uri in zip(lines, lines[1:]):
+        if not line.startswith('#EXT-X-STREAM-INF:') or uri.startswith('#'):
+            continue
+        height = RESOLUTION_ATTRIBUTE.search(line)
+        bandwidth = BANDWIDTH_ATTRIBUTE.search(line)
+        ladder.append([
+            int(height.group(1)) if height else 0,
+            int(bandwidth.group(1)) / 1000 if bandwidth else 0,
+            urljoin(url, uri)])
+    return sorted(ladder, key=lambda x: (x[0], x[1]))
+
+
+def stitchPlaylists(playlists, segmentURL):
+    """
+    Join the media playlists of the acts in one VOD playlist,
+    with a discontinuity between acts. Relative uris are made
+    absolute and segments are renamed by segmentURL.
+
+    :param      playlists:   url and text of the media playlist of each act
+    :type       playlists:   list
+    :param      segmentURL:  builds the url of the segment (act, index, url)
+    :type       segmentURL:  callable
+
+    :returns:   playlist text and segment urls of every act
+    :rtype:     tuple
+    """
+    version = 3
+    target = 1
+    lines = []
+    segments = []
+    for act, (url, text) in enumerate(playlists):
+        if act:
+            lines.append('#EXT-X-DISCONTINUITY')
+        urls = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                if line.startswith('#EXT-X-VERSION:'):
+                    version = max(version, int(line.split(':')[1]))
+                elif line.startswith('#EXT-X-TARGETDURATION:'):
+                    target = max(target, int(line.split(':')[1]))
+                if not line.startswith(HEADER_TAGS):
+                    lines.append(URI_ATTRIBUTE.sub(
+                        lambda m: f'URI="{urljoin(url, m.group(1))}"', line))
+                continue
+            urls.append(urljoin(url, line))
+            lines.append(segmentURL(act, len(urls) - 1, urls[-1]))
+        segments.append(urls)
+    header = [
+        '#EXTM3U',
+        f"#EXT-X-VERSION:{version}",
+        f"#EXT-X-TARGETDURATION:{target}",
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+    ]
+    return '\n'.join(header + lines + ['#EXT-X-ENDLIST', '']), segments
+
+
+class HLSProxy(object):
+    """
+    Local HTTP server joining the acts of an episode in one stream.
+
+    /master.m3u8?id=ID         one variant for every height of the ladder
+    /media.m3u8?id=ID&h=H      the acts at height H, with discontinuities
+    /s/TOKEN/ACT/N.ts          the segments, proxied so that the first
+                               segments of the next act are prefetched
+                               while the current one ends
+
+    ID is the key of the playback record, returned by getRecord.
+    """
+
+    def __init__(self, session, getRecord, port=0, log=None):
+        self.session = session
+        self.getRecord = getRecord
+        self.port = port
+        self.log = log or (lambda msg, level=0: None)
+        self._server = None
+        self._lock = threading.Lock()
+        self._playlists = OrderedDict()
+        self._segments = OrderedDict()
+        self._prefetching = {}
+
+    def start(self):
+        """
+        Start serving in a daemon thread, on a free port if port is 0.
+        """
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                proxy._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.log(f"hlsproxy, listening on port {self.port}", 1)
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, request):
+        path = urlsplit(request.path)
+        params = dict(parse_qsl(path.query))
+        try:
+            if path.path == '/master.m3u8':
+                self._send(request, self.master(params['id']), 'application/vnd.apple.mpegurl')
+            elif path.path == '/media.m3u8':
+                self._send(request, self.media(params['id'], int(params['h'])),
+                           'application/vnd.apple.mpegurl')
+            elif path.path.startswith('/s/'):
+                token, act, name = path.path[3:].split('/')
+                self._segment(request, token, int(act), int(name.split('.')[0]))
+            else:
+                request.send_error(404)
+        except LookupError as e:
+            self.log(f"hlsproxy, not found {request.path}: {e}", 2)
+            request.send_error(404)
+        except Exception as e:
+            self.log(f"hlsproxy, failed {request.path}: {e}", 3)
+            request.send_error(502)
+
+    def _send(self, request, text, contentType):
+        body = text.encode()
+        request.send_response(200)
+        request.send_header('Content-Type', contentType)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _record(self, id):
+        record = self.getRecord(id)
+        if not playback.isValid(record) or not record['acts']:
+            raise LookupError(f"no playback record for {id}")
+        return record
+
+    def master(self, id):
+        """
+        Master playlist of the record, one variant for every height
+        of the ladder of the first act.
+        """
+        acts = self._record(id)['acts']
+        rungs = {}
+        for height, kbps, url in acts[0]['ladder']:
+            rungs[height] = max(rungs.get(height, 0), kbps)
+        lines = ['#EXTM3U']
+        for height, kbps in sorted(rungs.items()):
+            lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={int(kbps * 1000) or 1}")
+            lines.append(mediaURL(self.port, id, height))
+        return '\n'.join(lines + [''])
+
+    def media(self, id, height):
+        """
+        Stitched media playlist of the acts at the highest rung
+        not taller than height. Acts without a ladder use the variant
+        of their master playlist picked the same way.
+        """
+        acts = sorted(self._record(id)['acts'], key=lambda x: x['idx'])
+        playlists = []
+        for act in acts:
+            url, text = self._playlist(playback.selectRung(act, height) or act['manifest'])
+            if '#EXT-X-STREAM-INF:' in text:
+                variant = playback.selectRung({'ladder': variantLadder(url, text)}, height)
+                if not variant:
+                    raise LookupError(f"no variant in {url}")
+                url, text = self._playlist(variant)
+            playlists.append((url, text))
+        token = hashlib.sha1(f"{id}/{height}".encode()).hexdigest()[:16]
+        text, segments = stitchPlaylists(
+            playlists, lambda act, n, url: (
+                f"/s/{token}/{act}/{n}{os.path.splitext(urlsplit(url).path)[1] or '.ts'}"))
+        with self._lock:
+            self._playlists[token] = segments
+            self._playlists.move_to_end(token)
+            while len(self._playlists) > MAX_PLAYLISTS:
+                self._playlists.popitem(last=False)
+        return text
+
+    def _playlist(self, url):
+        response = self.session.get(url, timeout=TIMEOUT)
+        response.raise_for_status()
+        return response.url or url, response.text
+
+    def _segment(self, request, token, act, n):
+        with self._lock:
+            segments = self._playlists[token]
+            url = segments[act][n]
+            pending = self._prefetching.get(url)
+        if n >= len(segments[act]) - PREFETCH_TRIGGER and act + 1 < len(segments):
+            for nextURL in segments[act + 1][:PREFETCH_SEGMENTS]:
+                self._prefetch(nextURL)
+        if pending:
+            pending.wait(TIMEOUT)
+        with self._lock:
+            prefetched = self._segments.pop(url, None)
+        if prefetched:
+            self.log(f"hlsproxy, serving prefetched segment {act}/{n}")
+            contentType, body = prefetched
+            request.send_response(200)
+            request.send_header('Content-Type', contentType)
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+            return
+        with self.session.get(url, timeout=TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            request.send_response(200)
+            request.send_header('Content-Type', response.headers.get('Content-Type', 'video/mp2t'))
+            if 'Content-Length' in response.headers:
+                request.send_header('Content-Length', response.headers['Content-Length'])
+            request.end_headers()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                request.wfile.write(chunk)
+
+    def _prefetch(self, url):
+        with self._lock:
+            if url in self._segments or url in self._prefetching:
+                return
+            self._prefetching[url] = threading.Event()
+        threading.Thread(target=self._download, args=(url,), daemon=True).start()
+
+    def _download(self, url):
+        try:
+            response = self.session.get(url, timeout=TIMEOUT)
+            response.raise_for_status()
+            with self._lock:
+                self._segments[url] = (
+                    response.headers.get('Content-Type', 'video/mp2t'), response.content)
+                while len(self._segments) > MAX_SEGMENTS:
+                    self._segments.popitem(last=False)
+        except Exception as e:
+            self.log(f"hlsproxy, prefetch failed {url}: {e}", 2)
+        finally:
+            with self._lock:
+                self._prefetching.pop(url).set()
@@ -1,4 +1,7 @@
+import sys
+
 from resources.lib import addonutils
+from resources.lib import trace
 from resources.lib.comedycentral import CC
 
 
@@ -6,54 +9,89 @@ class ComedyCentral(object):
 
     def __init__(self):
         self.cc = CC()
-        self._ISA = addonutils.getSettingAsBool('UseInputStream')
-        self._FISA = addonutils.getSettingAsBool('ForceInputstream')
 
     def addItems(self, items):
-        media_type = []
-        for item in items or []:
-            if item.get('videoInfo'):
-                media_type.append(item['videoInfo'].get('mediatype'))
-            addonutils.addListItem(
-                label=item.get('label'),
-                label2=item.get('label2'),
-                params=item.get('params'),
-                arts=item.get('arts'),
-                videoInfo=item.get('videoInfo'),
-                isFolder=False if item.get('playable') else True,
-            )
-
-        media_type = list(set(media_type))
+        media_type = set()
+        added = addonutils.addListItems(self._directoryItems(items, media_type))
+        trace.count('items', added)
         if len(media_type) == 1:
-            addonutils.setContent(f"{media_type[0]}s")
+            addonutils.setContent(f"{media_type.pop()}s")
 
+    def _directoryItems(self, items, media_type):
+        for item in items or []:
+            if item.get('videoInfo'):
+                media_type.add(item['videoInfo'].get('mediatype'))
+            with trace.span('render'):
+                entry = addonutils.createDirectoryItem(
+                    label=item.get('label'),
+                    label2=item.get('label2'),
+                    params=item.get('params'),
+                    arts=item.get('arts'),
+                    videoInfo=item.get('videoInfo'),
+                    isFolder=False if item.get('playable') else True,
+                )
+            yield entry
 
     def main(self):
+        addonutils.log(
+            f"Starting with command \"{sys.argv[2] if len(sys.argv) > 2 else ''}\"", 1)
         params = addonutils.getParams()
+        trace.start(params)
+        try:
+            self._main(params)
+        finally:
+            trace.finish()
+
+    def _main(self, params):
         if 'mode' in params:
             if params['mode'] == 'SHOWS':
-                shows = self.cc.showsList(params['url'])
+                shows = self.cc.cachedListing(params, self.cc.showsList(params['url']))
                 self.addItems(shows)
                 addonutils.setContent('tvshows')
 
             elif params['mode'] == 'GENERIC':
-                generic = self.cc.genericList(params.get('name'), params['url'])
+                generic = self.cc.cachedListing(
+                    params, self.cc.genericList(params.get('name'), params['url']))
                 self.addItems(generic)
 
             elif params['mode'] == 'SEASON':
-                show = self.cc.loadShows(params.get('name'), params['url'], True)
+                show = self.cc.cachedListing(
+                    params, self.cc.loadShows(params.get('name'), params['url'], True))
                 self.addItems(show)
 
             elif params['mode'] == 'EPISODES':
-                episodes = self.cc.loadItems(params.get('name'), params['url'])
+                episodes = self.cc.cachedListing(
+                    params, self.cc.loadItems(params.get('name'), params['url']))
+                self.addItems(episodes)
+                addonutils.setContent('episodes')
+
+            elif params['mode'] == 'EPISODES_ALL':
+                episodes = self.cc.cachedListing(
+                    params, self.cc.loadAllItems(params.get('name'), params['url']))
                 self.addItems(episodes)
                 addonutils.setContent('episodes')
 
+            elif params['mode'] == 'SEARCH':
+                results = self.cc.search(params.get('text'))
+                self.addItems(results)
+
+            elif params['mode'] == 'RECENT':
+                recent = self.cc.loadRecent()
+                self.addItems(recent)
+                addonutils.setContent('episodes')
+
             elif params['mode'] == 'PLAY':
+                self._ISA = addonutils.getSettingAsBool('UseInputStream')
+                self._FISA = addonutils.getSettingAsBool('ForceInputstream')
                 select_quality = not self._ISA or (self._ISA and self._FISA)
                 playItems = self.cc.getMediaUrl(
                     params['name'], params['url'],
                     params.get('mgid'), select_quality)
+                port = addonutils.getWindowProperty('proxy')
+                if port and addonutils.getSettingAsBool('StitchActs'):
+                    playItems = self.cc.stitchItems(
+                        params['name'], playItems, int(port), params['url'],
+                        params.get('mgid'), select_quality)
                 plst = addonutils.getPlaylist()
 
                 for item in playItems:
@@ -79,5 +117,6 @@ class ComedyCentral(object):
             menu = self.cc.getMainMenu()
             self.addItems(menu)
 
-        self.cc = None
         addonutils.endScript(exit=False)
+        self.cc.close()
+        self.cc = None
@@ -0,0 +1,150 @@
+import json
+import re
+
+DATA_MARKER = '__DATA__'
+DATA_ASSIGN = re.compile(r'\s*=\s*')
+DECODER = json.JSONDecoder()
+
+
+def extractData(html):
+    """
+    Extract the page state assigned to window.__DATA__ in cc.com pages.
+    The JSON value is decoded in place starting right after the
+    assignment, so the rest of the page is never scanned or copied.
+
+    :param      html:  The page content
+    :type       html:  str
+
+    :returns:   page state
+    :rtype:     json
+    """
+    idx = html.find(DATA_MARKER)
+    while idx != -1:
+        assign = DATA_ASSIGN.match(html, idx + len(DATA_MARKER))
+        if assign:
+            return DECODER.raw_decode(html, assign.end())[0]
+        idx = html.find(DATA_MARKER, idx + len(DATA_MARKER))
+    raise ValueError(f"{DATA_MARKER} not found")
+
+
+class Page(object):
+    """
+    Typed view of the data of a cc.com page or api response.
+    Every node is indexed by its 'type' (and by the 'type' of its props)
+    and every card by its 'cardType' in one traversal of the tree,
+    done on the first query. Cards are taken only from the LineList
+    elements of MainContainer, directly or inside Fragments, the ones
+    of other containers (carousels, promos) are not listed.
+    """
+
+    def __init__(self, data):
+        self.data = data or {}
+        self._types = None
+        self._cards = None
+        self._items = None
+        self._more = None
+
+    def _index(self):
+        if self._types is not None:
+            return
+        self._types = {}
+        self._cards = {}
+        self._items = []
+        self._more = []
+        if 'items' in self.data:
+            # api response, just a list of cards
+            self._addItems(self.data.get('items'), self.data.get('loadMore'))
+        else:
+            self._walk(self.data.get('children'))
+
+    def _walk(self, nodes, listed=False):
+        for node in nodes or []:
+            if not isinstance(node, dict):
+                continue
+            type = node.get('type')
+            self._types.setdefault(type, []).append(node)
+            props = node.get('props')
+            if isinstance(props, dict):
+                if props.get('type'):
+                    self._types.setdefault(props['type'], []).append(props)
+                if listed and type == 'LineList':
+                    self._addItems(props.get('items'), props.get('loadMore'))
+            self._walk(node.get('children'), type == 'MainContainer' or (
+                listed and type == 'Fragment'))
+
+    def _addItems(self, items, loadMore):
+        for item in items or []:
+            if not item:
+                continue
+            self._cards.setdefault(item.get('cardType'), []).append(
+                (len(self._items), item))
+            self._items.append(item)
+        if loadMore:
+            self._more.append(loadMore)
+            self._items.append(loadMore)
+
+    def nodes(self, type):
+        """
+        All the nodes with the provided 'type', in page order.
+
+        :param      type:  'type' key to search
+        :type       type:  str
+
+        :returns:   nodes
+        :rtype:     list
+        """
+        self._index()
+        return self._types.get(type) or []
+
+    def first(self, type):
+        """
+        The first node with the provided 'type' or None.
+
+        :param      type:  'type' key to search
+        :type       type:  str
+
+        :returns:   node
+        :rtype:     dict
+        """
+        nodes = self.nodes(type)
+        return nodes[0] if nodes else None
+
+    def items(self):
+        """
+        Cards of all the LineList elements, each list followed
+        by its 'load more' element if present.
+
+        :returns:   items
+        :rtype:     list
+        """
+        self._index()
+        return self._items
+
+    def cards(self, *cardTypes):
+        """
+        Cards with one of the provided 'cardType', in page order.
+        All cards if no cardType is provided.
+
+        :param      cardTypes:  'cardType' keys to search
+        :type       cardTypes:  str
+
+        :returns:   cards
+        :rtype:     list
+        """
+        self._index()
+        if not cardTypes:
+            cardTypes = self._cards.keys()
+        found = []
+        for cardType in cardTypes:
+            found.extend(self._cards.get(cardType) or [])
+        return [item for pos, item in sorted(found, key=lambda x: x[0])]
+
+    def loadMore(self):
+        """
+        The 'load more' elements of the page.
+
+        :returns:   load more elements
+        :rtype:     list
+        """
+        self._index()
+        return self._more
@@ -0,0 +1,171 @@
+import bisect
+import json
+import time
+
+from urllib.parse import urljoin
+
+# bump when the record layout changes, older records are resolved again
+RECORD_VERSION = 2
+# bandwidth needed to sustain a rung, relative to its bitrate
+HEADROOM = 1.5
+# max bytes and seconds spent measuring the bandwidth
+PROBE_BYTES = 512 * 1024
+PROBE_SECONDS = 3
+
+
+def createRecord(ytInfo):
+    """
+    Build the playback record of an extract_info result, keeping only
+    what is needed to play it. Layout of the version 2 record:
+
+    {
+        'v': 2,
+        'type': extract_info '_type',
+        'count': number of acts of the playlist, None if unknown,
+        'acts': [{
+            'idx': 0-based index of the act,
+            'count': number of acts,
+            'manifest': url of the hls master playlist,
+            'ladder': [[height, kbps, url], ...] sorted by height and bitrate,
+            'subs': [vtt subtitle urls],
+            'duration': seconds,
+            'thumbnail': url,
+        }, ...],
+    }
+
+    :param      ytInfo:  extract_info result
+    :type       ytInfo:  dict
+
+    :returns:   playback record
+    :rtype:     dict
+    """
+    acts = []
+    for video in ytInfo.get('entries') or []:
+        vidIDX = video.get('playlist_index') or video.get('playlist_autonumber') or 1
+        subs = (video.get('subtitles') or {}).get('en') or []
+        # formats without height are kept at the bottom, if they are video
+        ladder = [
+            [x.get('height') or 0, x.get('tbr') or 0, x['url']]
+            for x in video.get('formats') or []
+            if x.get('url') and (x.get('height') or x.get('vcodec') not in [None, 'none'])]
+        acts.append({
+            'idx': vidIDX - 1,
+            'count': video.get('playlist_count') or video.get('n_entries') or 1,
+            'manifest': video.get('url'),
+            'ladder': sorted(ladder, key=lambda x: (x[0], x[1])),
+            'subs': [x['url'] for x in subs if 'url' in x and x.get('ext') == 'vtt'],
+            'duration': video.get('duration'),
+            'thumbnail': video.get('thumbnail'),
+        })
+    return {
+        'v': RECORD_VERSION,
+        'type': ytInfo.get('_type'),
+        'count': ytInfo.get('playlist_count'),
+        'acts': acts,
+    }
+
+
+def mergeRecords(record, other):
+    """
+    Join the acts of two records of the same playlist, resolved
+    with different playlist_items.
+
+    :param      record:  The record
+    :type       record:  dict
+    :param      other:   The record with the other acts
+    :type       other:   dict
+
+    :returns:   playback record
+    :rtype:     dict
+    """
+    acts = {x['idx']: x for x in other['acts']}
+    acts.update({x['idx']: x for x in record['acts']})
+    count = record.get('count') or other.get('count') or len(acts)
+    return dict(record, count=count, acts=[
+        dict(acts[x], count=count) for x in sorted(acts)])
+
+
+def isValid(record):
+    """
+    Check the record has been created by the current createRecord
+
+    :param      record:  The record
+    :type       record:  dict
+
+    :returns:   True if valid
+    :rtype:     bool
+    """
+    return isinstance(record, dict) and record.get('v') == RECORD_VERSION
+
+
+def recordSize(record):
+    """
+    Size of the record once serialized
+
+    :param      record:  The record
+    :type       record:  dict
+
+    :returns:   size in bytes
+    :rtype:     int
+    """
+    return len(json.dumps(record, separators=(',', ':')))
+
+
+def selectRung(act, maxHeight, bandwidth=None):
+    """
+    Url of the highest rung of the quality ladder not taller than
+    maxHeight and, if the bandwidth is known, that can be sustained.
+    Falls back to the lowest rung if none fits.
+
+    :param      act:        The act of a playback record
+    :type       act:        dict
+    :param      maxHeight:  max height allowed
+    :type       maxHeight:  int
+    :param      bandwidth:  measured bandwidth in bit/s
+    :type       bandwidth:  float
+
+    :returns:   url or None
+    :rtype:     str
+    """
+    ladder = act['ladder']
+    if not ladder:
+        return None
+    top = bisect.bisect_right([x[0] for x in ladder], maxHeight)
+    for height, kbps, url in reversed(ladder[:top]):
+        if not bandwidth or kbps * 1000 * HEADROOM <= bandwidth:
+            return url
+    return ladder[0][2]
+
+
+def measureBandwidth(session, act, timeout=PROBE_SECONDS):
+    """
+    Estimate the bandwidth downloading the first segment
+    of the lowest rung of the act.
+
+    :param      session:  requests session
+    :type       session:  requests.Session
+    :param      act:      The act of a playback record
+    :type       act:      dict
+    :param      timeout:  max seconds spent downloading
+    :type       timeout:  float
+
+    :returns:   bandwidth in bit/s, None if it can't be measured
+    :rtype:     float
+    """
+    if not act['ladder']:
+        return None
+    playlist = act['ladder'][0][2]
+    try:
+        start = time.monotonic()
+        response = session.get(playlist, timeout=timeout)
+        segment = next(x.strip() for x in response.text.splitlines()
+                       if x.strip() and not x.startswith('#'))
+        size = len(response.content)
+        with session.get(urljoin(playlist, segment), timeout=timeout, stream=True) as response:
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size >= PROBE_BYTES or time.monotonic() - start >= timeout:
+                    break
+        return size * 8 / max(time.monotonic() - start, 0.001)
+    except Exception:
+        return None
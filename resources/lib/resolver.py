@@ -0,0 +1,88 @@
+import threading
+
+# extractor of cc.com urls and mgids
+IE_KEY = 'ComedyCentral'
+# only the info is needed: no download, post-processing, format
+# probing or listing, and no cache folder of yt-dlp
+PARAMS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noprogress': True,
+    'simulate': True,
+    'skip_download': True,
+    'force_generic_extractor': False,
+    'check_formats': False,
+    'listformats': False,
+    'listsubtitles': False,
+    'writesubtitles': False,
+    'postprocessors': [],
+    'cachedir': False,
+}
+
+
+class Resolver(object):
+    """
+    Configured YoutubeDL instances for the invocation, one per thread
+    so that resolves run in parallel. The ComedyCentral extractor
+    is used for the ids it is suitable for, the default extractors
+    are registered only for the others.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or (lambda msg, level=0: None)
+        self._local = threading.local()
+
+    @property
+    def ydl(self):
+        """
+        The YoutubeDL instance of the calling thread, yt-dlp is
+        imported on first use
+        """
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            from resources.lib import yt_dlp
+
+            self.log(f"yt-dlp version: {yt_dlp.version.__version__}")
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(dict(PARAMS), auto_init=False)
+            self._local.defaults = False
+        return ydl
+
+    def ieKey(self, id):
+        """
+        Key of the extractor of the id, None if not ComedyCentral
+
+        :param      id:  url or mgid
+        :type       id:  str
+
+        :returns:   extractor key or None
+        :rtype:     str
+        """
+        try:
+            if self.ydl.get_info_extractor(IE_KEY).suitable(id):
+                return IE_KEY
+        except Exception as e:
+            self.log(f"resolver, no {IE_KEY} extractor: {e}", 2)
+        return None
+
+    def extractInfo(self, id, items=None, defaults=False):
+        """
+        extract_info result of the url or mgid
+
+        :param      id:        url or mgid
+        :type       id:        str
+        :param      items:     yt-dlp playlist_items, like 1 or 2-5
+        :type       items:     str
+        :param      defaults:  use the default extractors, as YoutubeDL does
+        :type       defaults:  bool
+
+        :returns:   extract_info result
+        :rtype:     dict
+        """
+        ydl = self.ydl
+        ieKey = None if defaults else self.ieKey(id)
+        if ieKey is None and not self._local.defaults:
+            self.log(f"resolver, default extractors for {id}", 1)
+            ydl.add_default_info_extractors()
+            self._local.defaults = True
+        ydl.params['playlist_items'] = items
+        return ydl.extract_info(id, download=False, ie_key=ieKey)
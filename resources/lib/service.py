@@ -0,0 +1,131 @@
+import time
+
+import xbmc
+
+from resources.lib import addonutils
+from resources.lib.comedycentral import CC
+from resources.lib.comedycentral import getSession
+
+# seconds between checks of the schedule and of the idle state
+CHECK_INTERVAL = 60
+# seconds between two page downloads, to stay in the background
+REQUEST_PAUSE = 2
+
+
+class Service(object):
+    """
+    Keeps the pages of the main menu, and optionally the first
+    pages they link to, fresh in the cache while Kodi is idle.
+    Hosts the HLS proxy playing the acts of an episode as one stream.
+    """
+
+    def __init__(self):
+        self.monitor = xbmc.Monitor()
+        self._last = 0
+        self._proxy = None
+
+    def _log(self, msg, level=1):
+        addonutils.log(f"service, {msg}", level)
+
+    def _canRun(self):
+        """
+        Check Kodi is idle and nothing is playing
+
+        :returns:   True if the service can download
+        :rtype:     bool
+        """
+        idle = addonutils.getSettingAsInt('ServiceIdle') * 60
+        return addonutils.getIdleTime() >= idle and not addonutils.isPlaying()
+
+    def _isDue(self):
+        """
+        Check if it's time to refresh the pages
+
+        :returns:   True if the refresh is due
+        :rtype:     bool
+        """
+        if not addonutils.getSettingAsBool('ServiceEnabled'):
+            return False
+        hours = max(1, addonutils.getSettingAsInt('ServiceInterval'))
+        return time.time() - self._last >= hours * 3600
+
+    def _stop(self):
+        return self.monitor.abortRequested() or not self._canRun()
+
+    def refresh(self):
+        """
+        Revalidate the main menu pages and the pages they link to.
+        Stops as soon as Kodi is not idle anymore.
+
+        :returns:   True if completed
+        :rtype:     bool
+        """
+        cc = CC()
+        try:
+            return self._refresh(cc)
+        finally:
+            cc.close()
+
+    def _refresh(self, cc):
+        children = addonutils.getSettingAsBool('ServiceChildren')
+        done = set()
+        for item in cc.getMainMenu():
+            if 'url' not in item['params']:
+                # catalog modes, served without network
+                continue
+            menuURL = item['params']['url']
+            urls = [(menuURL, 1 if item['params']['mode'] == 'EPISODES' else 24)]
+            while urls:
+                if self._stop():
+                    self._log('refresh interrupted')
+                    return False
+                url, hours = urls.pop(0)
+                if url in done:
+                    continue
+                done.add(url)
+                try:
+                    page, size = cc.refreshPage(url, hours)
+                    self._log(f"refreshed {url}, bytes = {size}")
+                except Exception as e:
+                    self._log(f"refresh failed {url}: {e}", 2)
+                    continue
+                if children and url == menuURL:
+                    urls.extend((x, 24) for x in cc.folderURLs(page))
+                if self.monitor.waitForAbort(REQUEST_PAUSE):
+                    return False
+        return True
+
+    def _updateProxy(self):
+        """
+        Start or stop the HLS proxy following the StitchActs setting,
+        its port is published in a window property for the plugin.
+        """
+        enabled = addonutils.getSettingAsBool('StitchActs')
+        if enabled and self._proxy is None:
+            from resources.lib.hlsproxy import HLSProxy
+
+            cc = CC()
+            self._proxy = HLSProxy(getSession(), cc.playbackRecord, log=self._log)
+            try:
+                self._proxy.start()
+            except OSError as e:
+                self._log(f"proxy failed to start: {e}", 3)
+                self._proxy = None
+                return
+            addonutils.setWindowProperty('proxy', self._proxy.port)
+        elif not enabled and self._proxy is not None:
+            addonutils.clearWindowProperty('proxy')
+            self._proxy.stop()
+            self._proxy = None
+
+    def run(self):
+        self._log('started')
+        self._updateProxy()
+        while not self.monitor.waitForAbort(CHECK_INTERVAL):
+            self._updateProxy()
+            if self._isDue() and self._canRun() and self.refresh():
+                self._last = time.time()
+        if self._proxy is not None:
+            addonutils.clearWindowProperty('proxy')
+            self._proxy.stop()
+        self._log('stopped')
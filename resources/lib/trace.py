@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+
+from resources.lib import addonutils
+
+# trace file in the addon profile, rotated once bigger than MAX_BYTES
+TRACE_FILE = 'trace.jsonl'
+MAX_BYTES = 256 * 1024
+
+ENABLED = False
+_lock = threading.Lock()
+_record = {}
+
+
+class _Span(object):
+    """
+    Times a block and adds it to the spans of the invocation.
+    """
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        with _lock:
+            span = _record['spans'].setdefault(self.name, [0, 0.0, 0.0])
+            span[0] += 1
+            span[1] += elapsed
+            span[2] = max(span[2], elapsed)
+
+
+class _NoSpan(object):
+    """
+    Returned by span when tracing is disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def start(params):
+    """
+    Start tracing the invocation, if enabled in the settings
+    or by DevMode.
+
+    :param      params:  the plugin params
+    :type       params:  dict
+    """
+    global ENABLED, _record
+    ENABLED = (addonutils.getSettingAsBool('TraceEnabled')
+               or addonutils.getSettingAsBool('DevMode'))
+    if not ENABLED:
+        return
+    _record = {
+        'time': int(time.time()),
+        'version': addonutils.VERSION,
+        'mode': params.get('mode', 'MENU'),
+        'url': params.get('url'),
+        'start': time.perf_counter(),
+        'spans': {},
+        'counters': {},
+    }
+
+
+def span(name):
+    """
+    Context manager timing the block as the span name,
+    spans with the same name are summed up.
+
+    :param      name:  name of the span
+    :type       name:  str
+    """
+    return _Span(name) if ENABLED else _NO_SPAN
+
+
+def count(name, value=1):
+    """
+    Add value to the counter name.
+
+    :param      name:   name of the counter
+    :type       name:   str
+    :param      value:  value to add
+    :type       value:  int
+    """
+    if ENABLED:
+        with _lock:
+            _record['counters'][name] = _record['counters'].get(name, 0) + value
+
+
+def finish():
+    """
+    Append the record of the invocation to the trace file.
+    """
+    global ENABLED
+    if not ENABLED:
+        return
+    ENABLED = False
+    record = dict(_record)
+    record['ms'] = round((time.perf_counter() - record.pop('start')) * 1000, 1)
+    record['spans'] = {
+        k: {'n': n, 'ms': round(total, 1), 'max': round(top, 1)}
+        for k, (n, total, top) in record['spans'].items()}
+    try:
+        os.makedirs(addonutils.DATA_PATH_T, exist_ok=True)
+        path = os.path.join(addonutils.DATA_PATH_T, TRACE_FILE)
+        if os.path.exists(path) and os.path.getsize(path) > MAX_BYTES:
+            os.replace(path, f"{path}.1")
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+    except OSError as e:
+        addonutils.log(f"trace, can't write the trace file: {e}", 2)
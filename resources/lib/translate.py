@@ -1,5 +1,4 @@
-from resources.lib.addonutils import LANGUAGE
-from resources.lib.addonutils import log
+from resources.lib import addonutils
 
 T_MAP = {
     'shows': 32001,
@@ -7,6 +6,9 @@ T_MAP = {
     'standup': 32003,
     'digital.original': 32004,
     'load.more': 32005,
+    'all.episodes': 32006,
+    'recent': 32007,
+    'search': 32008,
     'error.openurl': 33001,
     'error.no.json': 33002,
     'error.no.video': 33003,
@@ -18,6 +20,6 @@ T_MAP = {
 def translatedString(id):
     t_string = T_MAP.get(id)
     if t_string:
-        return LANGUAGE(t_string)
-    log(f"{id} translation ID not found.", 3)
+        return addonutils.LANGUAGE(t_string)
+    addonutils.log(f"{id} translation ID not found.", 3)
     return 'NO TRANSLATION AVAILABLE'
@@ -0,0 +1,4 @@
+# author: nixxo
+from resources.lib.service import Service
+
+Service().run()